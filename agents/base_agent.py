@@ -4,6 +4,7 @@ from typing_extensions import TypedDict
 from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage, AIMessage
 from langgraph.prebuilt import ToolNode
 from common.common import MultiAgentState
+from common.deadline import invoke_with_deadline, state_deadline
 
 class BaseAgent:
     "Agent for general conversation and tasks not requiring specialized tools." # Needed as per langchain tempalte defnition if you dont include decription
@@ -24,6 +25,6 @@ Be friendly, helpful, and concise.
         messages = state["messages"]
         system_msg = SystemMessage(content=self.system_prompt)
         full_messages = [system_msg] + list(messages)
-        response = self.llm.invoke(full_messages)
+        response = invoke_with_deadline(self.llm, full_messages, deadline=state_deadline(state))
         
         return {"messages": [response]}
\ No newline at end of file
@@ -3,6 +3,7 @@ from typing import TypedDict, Annotated, Sequence
 from typing_extensions import TypedDict
 from langchain_core.messages import SystemMessage, HumanMessage
 from common.common import MultiAgentState
+from common.deadline import invoke_with_deadline, state_deadline
 
 class CoordinatorAgent:
     "Coordinates multi-step agent execution."
@@ -12,10 +13,11 @@ class CoordinatorAgent:
     
     def process(self, state: MultiAgentState):
         # Check if more steps needed or give final output
-        task_context = state.get("task_context", {})
+        # Copies, not in-place edits: with durability="async" the previous checkpoint may still be serialising this state
+        task_context = dict(state.get("task_context", {}))
         plan = task_context.get("plan", [])
         current_step = task_context.get("current_step", 0)
-        plan_results = task_context.get("plan_results", [])
+        plan_results = list(task_context.get("plan_results", []))
         
         # Store result from previous agent
         if len(state["messages"]) > 0:
@@ -65,7 +67,7 @@ class CoordinatorAgent:
             HumanMessage(content=synthesis_prompt)
         ]
         
-        response = self.llm.invoke(messages)
+        response = invoke_with_deadline(self.llm, messages, deadline=state_deadline(state))
         
         return {
             "messages": [response],
@@ -5,6 +5,7 @@ from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage, AI
 from langgraph.prebuilt import ToolNode
 from tools.toolkit import calculate
 from common.common import MultiAgentState
+from common.deadline import invoke_with_deadline, state_deadline
 
 class MathAgent:
     "Agent specialized in mathematical calculations."
@@ -29,7 +30,7 @@ Use the calculate tool to perform computations. Be precise and explain your work
         full_messages = [system_msg] + list(messages)
         # Bind tools to LLM
         llm_with_tools = self.llm.bind_tools(self.tools)
-        response = llm_with_tools.invoke(full_messages)
+        response = invoke_with_deadline(llm_with_tools, full_messages, deadline=state_deadline(state))
         return {"messages": [response]}
     
     def should_use_tools(self, state: MultiAgentState):
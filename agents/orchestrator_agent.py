@@ -3,6 +3,8 @@ from typing import TypedDict, Annotated, Sequence
 from typing_extensions import TypedDict
 from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage, AIMessage
 from common.common import MultiAgentState
+from common.deadline import invoke_with_deadline, state_deadline
+from tools.prefetch import kb_prefetcher
 
 class Orchestrator:
     "Orchestrator that routes requests to appropriate specialized agents."
@@ -36,14 +38,18 @@ Query: {query}
             # HumanMessage(content=user_message)
         ]
         # Ask LLM to route
-        response = self.llm.invoke(routing_messages)
+        response = invoke_with_deadline(self.llm, routing_messages, deadline=state_deadline(state), hedge="routing") # Routing is idempotent so it may be hedged
         # Parse the response to get agent name
         agent_name = response.content.strip().upper()
         # Validate agent name
-        valid_agents = ["PLANNER_AGENT", "COORDINATOR_AGENT", "MATH_AGENT", "RESEARCH_AGENT", "SUMMARY_AGENT", "BASE_AGENT"]
+        valid_agents = ["PLANNER_AGENT", "COORDINATOR_AGENT", "MATH_AGENT", "RESEARCH_AGENT", "SUMMARY_AGENT", "GENERAL_AGENT"]
+        if agent_name == "BASE_AGENT":
+            agent_name = "GENERAL_AGENT"  # The base agent's graph node is general_agent
         if agent_name not in valid_agents:
-            agent_name = "BASE_AGENT"  # Default fallback agent
+            agent_name = "GENERAL_AGENT"  # Default fallback agent
         print(f"\n Orchestrator routing to: {agent_name}")
+        # Drop the speculative knowledge-base search if this route will not use it
+        kb_prefetcher.keep_for_route(state.get("task_context", {}).get("kb_prefetch_id"), agent_name.lower())
         
         return {"next_agent": agent_name.lower()}
 
@@ -3,6 +3,7 @@ from typing import TypedDict, Annotated, Sequence
 from typing_extensions import TypedDict
 from langchain_core.messages import SystemMessage, HumanMessage
 from common.common import MultiAgentState
+from common.deadline import invoke_with_deadline, state_deadline
 
 # DO NOT REMOVE PLANNER AGENT, ORCHESTRATOR AGENT OR COORDINATOR AGENT IN THE TEMPLATE AS THEY ARE CRUCIAL IN THE WORKFLOW. THE OTHERS CAN BE EDITED OR REMOVED.
 
@@ -49,15 +50,13 @@ If the task is simple (only needs one agent), output just one step.
         user_query = messages[-1].content
         
         planning_messages = [system_msg, HumanMessage(content=user_query)]
-        response = self.llm.invoke(planning_messages)
+        response = invoke_with_deadline(self.llm, planning_messages, deadline=state_deadline(state))
     
         # Parse the plan
         plan = self._parse_plan(response.content)
         
-        # Store plan in task_context
-        state["task_context"]["plan"] = plan
-        state["task_context"]["current_step"] = 0
-        state["task_context"]["plan_results"] = []
+        # Store plan in a copy of task_context - the checkpoint of the state this node received may still be being written
+        task_context = {**state.get("task_context", {}), "plan": plan, "current_step": 0, "plan_results": []}
         
         # Route to first agent
         if plan:
@@ -65,9 +64,9 @@ If the task is simple (only needs one agent), output just one step.
             print(f"\n Plan created with {len(plan)} steps")
             for i, step in enumerate(plan, 1):
                 print(f"   Step {i}: {step['task']} -> {step['agent']}")
-            return {"next_agent": first_agent, "task_context": state["task_context"]}
+            return {"next_agent": first_agent, "task_context": task_context}
         
-        return {"next_agent": "base_agent"}
+        return {"next_agent": "general_agent"} # The base agent's graph node
     
     def _parse_plan(self, plan_text): # Instead of calling and deciding which tools we need for the agent, the planner agent should have a function on how parse the output plan from the LLM
         # Parse the plan into structured steps.
@@ -80,6 +79,8 @@ If the task is simple (only needs one agent), output just one step.
                     if len(parts) == 2:
                         task = parts[0].split(':', 1)[1].strip()
                         agent = parts[1].strip().lower()
+                        if agent == "base_agent":
+                            agent = "general_agent" # The base agent's graph node is general_agent
                         steps.append({"task": task, "agent": agent})
                 except:
                     continue
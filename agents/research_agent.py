@@ -4,7 +4,9 @@ from typing_extensions import TypedDict
 from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage, AIMessage
 from langgraph.prebuilt import ToolNode
 from tools.toolkit import search_knowledge_base, web_search
+from tools.prefetch import kb_prefetcher, KB_PREFETCH_WAIT_SECONDS
 from common.common import MultiAgentState
+from common.deadline import invoke_with_deadline, state_deadline, remaining_budget
     
 class ResearchAgent:
     "Agent specialized in knowledge retrieval and research."
@@ -27,12 +29,27 @@ Provide comprehensive, well-sourced answers.
     def process(self, state: MultiAgentState):
         # Process research queries via RAG or web
         messages = state["messages"]
+        task_context = dict(state.get("task_context", {})) # Copied because _prefetched_context updates it and checkpoints are written in the background
         system_msg = SystemMessage(content=self.system_prompt)
-        full_messages = [system_msg] + list(messages)
+        full_messages = [system_msg] + self._prefetched_context(task_context) + list(messages)
         llm_with_tools = self.llm.bind_tools(self.tools)
-        response = llm_with_tools.invoke(full_messages)
+        response = invoke_with_deadline(llm_with_tools, full_messages, deadline=state_deadline(state))
         
-        return {"messages": [response]}
+        return {"messages": [response], "task_context": task_context}
+    
+    def _prefetched_context(self, task_context):
+        # Use the knowledge-base search that ran speculatively during routing, kept in task_context for the rest of the tool loop
+        prefetch_id = task_context.pop("kb_prefetch_id", None)
+        if prefetch_id:
+            # Never wait on the prefetch longer than the turn has left
+            budget = remaining_budget(task_context.get("deadline"))
+            docs = kb_prefetcher.take(prefetch_id) if budget is None else kb_prefetcher.take(prefetch_id, timeout=max(min(budget, KB_PREFETCH_WAIT_SECONDS), 0))
+            if docs:
+                task_context["kb_prefetch_context"] = "\n\n".join([doc.page_content for doc in docs])
+        context = task_context.get("kb_prefetch_context")
+        if not context:
+            return []
+        return [SystemMessage(content=f"Knowledge base results already retrieved for the user's query (only call search_knowledge_base if you need something different):\n{context}")]
     
     def should_use_tools(self, state: MultiAgentState):
         last_message = state["messages"][-1]
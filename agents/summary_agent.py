@@ -5,6 +5,7 @@ from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage, AI
 from langgraph.prebuilt import ToolNode
 from tools.toolkit import summarize_text
 from common.common import MultiAgentState
+from common.deadline import invoke_with_deadline, state_deadline
     
 class SummaryAgent:
     "Agent specialized in text summarization and analysis."
@@ -30,7 +31,7 @@ Use the summarize_text tool for long content. Provide clear, structured summarie
         system_msg = SystemMessage(content=self.system_prompt)
         full_messages = [system_msg] + list(messages)
         llm_with_tools = self.llm.bind_tools(self.tools)
-        response = llm_with_tools.invoke(full_messages)
+        response = invoke_with_deadline(llm_with_tools, full_messages, deadline=state_deadline(state))
         
         return {"messages": [response]}
     
@@ -0,0 +1,50 @@
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from common.embedding_batcher import BatchedEmbeddings
+
+class SlowFakeEmbeddings(DeterministicFakeEmbedding):
+    "Fake embeddings that sleep per request to stand in for the Azure round trip."
+    latency: float = 0.05
+    calls: int = 0
+
+    def embed_documents(self, texts):
+        self.calls += 1
+        time.sleep(self.latency)
+        return super().embed_documents(texts)
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+def run(embeddings, requests, concurrency):
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(embeddings.embed_query, [f"query {i % max(requests // 2, 1)}" for i in range(requests)]))
+    return requests / (time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare embed_query throughput with and without micro-batching.")
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--latency", type=float, default=0.05, help="Simulated seconds per embedding request")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 64])
+    parser.add_argument("--window-ms", type=float, default=5)
+    args = parser.parse_args()
+
+    print(f"{'threads':>8} {'direct q/s':>11} {'calls':>6} {'batched q/s':>12} {'calls':>6} {'avg batch':>10} {'avg wait ms':>12}")
+    for concurrency in args.concurrency:
+        inner = SlowFakeEmbeddings(size=256, latency=args.latency)
+        direct = run(inner, args.requests, concurrency)
+        direct_calls, inner.calls = inner.calls, 0
+        batched_embeddings = BatchedEmbeddings(inner, max_wait_ms=args.window_ms)
+        batched = run(batched_embeddings, args.requests, concurrency)
+        stats = batched_embeddings.stats()
+        print(f"{concurrency:>8} {direct:>11.0f} {direct_calls:>6} {batched:>12.0f} {inner.calls:>6} "
+              f"{stats['avg_batch_size']:>10.1f} {stats['avg_queue_wait_ms']:>12.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from tools.ingest import IngestionPipeline
+from tools.localVector import LocalSearchVector
+
+class SlowFakeEmbeddings(DeterministicFakeEmbedding):
+    "Fake embeddings that sleep per request to stand in for the Azure round trip."
+    latency: float = 0.2
+
+    def embed_documents(self, texts):
+        time.sleep(self.latency)
+        return super().embed_documents(texts)
+
+def write_corpus(directory, files, words_per_file):
+    vocabulary = ["azure", "agent", "vector", "search", "memory", "planner", "router", "latency", "index", "token"]
+    rng = random.Random(42)
+    for i in range(files):
+        with open(os.path.join(directory, f"doc_{i:05d}.txt"), "w") as f:
+            f.write(" ".join(rng.choice(vocabulary) for _ in range(words_per_file)))
+
+def run(corpus, workdir, workers, latency, dim):
+    embeddings = SlowFakeEmbeddings(size=dim, latency=latency)
+    store = LocalSearchVector(os.path.join(workdir, f"index_{workers}.db"), embeddings)
+    pipeline = IngestionPipeline(store, embeddings, manifest_path=os.path.join(workdir, f"manifest_{workers}.db"), max_workers=workers)
+    first = pipeline.run(corpus)
+    second = pipeline.run(corpus) # Nothing changed, so every chunk should be skipped
+    return first, second
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the ingestion pipeline offline against the local vector backend.")
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--words", type=int, default=2000)
+    parser.add_argument("--latency", type=float, default=0.2, help="Simulated seconds per embedding request")
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 8])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        corpus = os.path.join(workdir, "corpus")
+        os.makedirs(corpus)
+        write_corpus(corpus, args.files, args.words)
+        print(f"{'workers':>8} {'chunks':>8} {'seconds':>9} {'chunks/s':>9} {'re-run s':>9} {'skipped':>8}")
+        for workers in args.workers:
+            first, second = run(corpus, workdir, workers, args.latency, args.dim)
+            print(f"{workers:>8} {first['chunks']:>8} {first['seconds']:>9.2f} {first['chunks'] / first['seconds']:>9.0f} "
+                  f"{second['seconds']:>9.2f} {second['skipped']:>8}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def cold_start(module, env):
+    "Wall-clock seconds for a fresh interpreter to import the module."
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", f"import {module}"], cwd=ROOT, env=env, check=True)
+    return time.perf_counter() - start
+
+def slowest_imports(module, env, top):
+    "Largest cumulative import times reported by python -X importtime."
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        rows.append((int(cumulative), name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold-start import time of the agent modules.")
+    parser.add_argument("--modules", nargs="+", default=["common.common", "tools.toolkit", "main"])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="Slowest imports to list per module")
+    parser.add_argument("--offline", action="store_true", help="Point the Azure endpoints at an unroutable address to prove startup needs no network")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    if args.offline:
+        for name in ("AZURE_OPENAI_ENDPOINT", "AZURE_EMBEDDINGS_ENDPOINT", "AZURE_SEARCH_ENDPOINT"):
+            env[name] = "https://10.255.255.1"
+
+    for module in args.modules:
+        times = [cold_start(module, env) for _ in range(args.runs)]
+        print(f"\n{module}: min {min(times):.3f}s, median {statistics.median(times):.3f}s over {args.runs} runs")
+        for cumulative, name in slowest_imports(module, env, args.top):
+            print(f"  {cumulative / 1e6:8.3f}s  {name}")
+
+if __name__ == "__main__":
+    main()
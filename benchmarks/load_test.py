@@ -0,0 +1,156 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from emulator.azure_emulator import start_emulator
+
+# A mix that exercises every route: direct answers, tools, retrieval and multi-step plans
+QUERIES = [
+    "What is 15 * 23 + 7?",
+    "Find the latest guidance on vector search",
+    "Summarize what we know about rate limits",
+    "Research embeddings and calculate 1200 * 1.05",
+    "Hello, what can you help me with?",
+    "Look up LangGraph checkpoints, compute 2 ** 10 and summarize the result",
+]
+
+def configure_environment(endpoint: str):
+    "Point every Azure client at the emulator; must run before main is imported."
+    os.environ.update({
+        "AZURE_OPENAI_ENDPOINT": endpoint,
+        "AZURE_OPENAI_API_KEY": "emulator",
+        "AZURE_OPENAI_DEPLOYMENT": "gpt-4o",
+        "AZURE_OPENAI_API_VERSION": "2024-06-01",
+        "AZURE_EMBEDDINGS_ENDPOINT": endpoint,
+        "AZURE_EMBEDDINGS_API_KEY": "emulator",
+        "AZURE_EMBEDDINGS_DEPLOYMENT": "text-embedding-3-small",
+        "AZURE_EMBEDDINGS_API_VERSION": "2024-06-01",
+        "AZURE_EMBEDDINGS_CHECK_CTX_LENGTH": "false",
+        "AZURE_SEARCH_ENDPOINT": endpoint,
+        "AZURE_SEARCH_INDEX_NAME": "load-test",
+        "AZURE_SEARCH_KEY": "emulator",
+        "VECTOR_BACKEND": "azure",
+        "MEMORY_BACKEND": "sqlite",
+        "PHOENIX_TRACING": "false",
+    })
+
+def emulator_stats(endpoint: str):
+    try:
+        with urllib.request.urlopen(f"{endpoint}/emulator/stats", timeout=5) as response:
+            return json.load(response)
+    except Exception:
+        return {}
+
+def run_level(submit, concurrency: int, turns: int, run_id: str):
+    "Run `concurrency` sessions at once, each sending `turns` messages back to back; return per-turn results and wall time."
+    results = []
+    lock = threading.Lock()
+
+    def session(index):
+        session_id = f"load-{run_id}-{concurrency}-{index}"
+        for turn in range(turns):
+            query = QUERIES[(index + turn) % len(QUERIES)]
+            start = time.perf_counter()
+            try:
+                answer = submit(session_id, query)
+                outcome = "partial" if "ran out of time" in answer else "ok"
+            except Exception as e:
+                outcome = f"error: {type(e).__name__}: {e}"
+            with lock:
+                results.append((outcome, time.perf_counter() - start))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(session, range(concurrency)))
+    return results, time.perf_counter() - start
+
+def summarize(results, elapsed: float):
+    latencies = np.array([latency for outcome, latency in results if outcome == "ok"] or [0.0])
+    errors = sum(1 for outcome, _ in results if outcome.startswith("error"))
+    partial = sum(1 for outcome, _ in results if outcome == "partial")
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {
+        "turns": len(results),
+        "throughput": (len(results) - errors) / elapsed,
+        "p50": p50, "p95": p95, "p99": p99,
+        "error_rate": errors / len(results),
+        "partial_rate": partial / len(results),
+        "errors": sorted({outcome for outcome, _ in results if outcome.startswith("error")}),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive concurrent sessions through run_multi_agent against the local Azure emulator.")
+    parser.add_argument("--endpoint", help="Use an already running emulator instead of starting one in-process")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16])
+    parser.add_argument("--turns", type=int, default=3, help="Turns per session, sent sequentially")
+    parser.add_argument("--workers", type=int, default=0, help="Run turns on a supervisor.WorkerPool of this many processes (0 = in-process)")
+    parser.add_argument("--latency", action="append", metavar="ENDPOINT=SPEC", default=[],
+                        help="Emulator latency, e.g. chat=lognormal:600:0.4 (default), embeddings=uniform:20:60, search=fixed:40")
+    parser.add_argument("--error-rate", action="append", metavar="ENDPOINT=RATE", default=[], help="Emulator 429 rate, e.g. chat=0.02")
+    parser.add_argument("--dimensions", type=int, default=1536)
+    parser.add_argument("--saturation-gain", type=float, default=0.1, help="Throughput gain below which a level counts as saturated")
+    args = parser.parse_args()
+
+    if args.endpoint:
+        endpoint = args.endpoint.rstrip("/")
+    else:
+        latency = {"chat": "lognormal:600:0.4", "embeddings": "uniform:20:60", "search": "uniform:20:60"}
+        latency.update(dict(value.split("=", 1) for value in args.latency))
+        error_rate = {name: float(rate) for name, rate in (value.split("=", 1) for value in args.error_rate)}
+        _, endpoint = start_emulator(latency=latency, error_rate=error_rate, dimensions=args.dimensions, seed=42)
+        print(f"Started emulator at {endpoint} with latency {latency} and 429 rates {error_rate or 'none'}")
+    configure_environment(endpoint)
+    os.environ.setdefault("WORKER_THREADS", str(max(args.concurrency))) # Sizes the deadline pool for the in-process run
+    # Chat history, checkpoints and local indexes land in a scratch directory instead of the repo
+    os.chdir(tempfile.mkdtemp(prefix="load-test-"))
+
+    pool = None
+    if args.workers:
+        from supervisor import WorkerPool
+        pool = WorkerPool(workers=args.workers, threads=max(args.concurrency)).start()
+        submit = lambda session_id, query: pool.submit(session_id, query).result()
+    else:
+        from main import run_multi_agent, get_multi_agent_system
+        get_multi_agent_system() # Build outside the timed runs
+        submit = lambda session_id, query: run_multi_agent(query, session_id=session_id)
+
+    run_id = uuid.uuid4().hex[:6]
+    print(f"{'sessions':>9} {'turns':>6} {'turns/s':>8} {'p50 s':>7} {'p95 s':>7} {'p99 s':>7} {'errors':>7} {'partial':>8}")
+    best, saturation = 0.0, None
+    try:
+        for concurrency in args.concurrency:
+            before = emulator_stats(endpoint)
+            results, elapsed = run_level(submit, concurrency, args.turns, run_id)
+            summary = summarize(results, elapsed)
+            after = emulator_stats(endpoint)
+            throttled = sum(after.get(name, {}).get("throttled", 0) - before.get(name, {}).get("throttled", 0) for name in after)
+            marker = ""
+            if saturation is None and best and summary["throughput"] < best * (1 + args.saturation_gain):
+                saturation = concurrency
+                marker = "  <- saturated"
+            best = max(best, summary["throughput"])
+            print(f"{concurrency:>9} {summary['turns']:>6} {summary['throughput']:>8.2f} {summary['p50']:>7.2f} {summary['p95']:>7.2f} "
+                  f"{summary['p99']:>7.2f} {summary['error_rate']:>7.1%} {summary['partial_rate']:>8.1%}{marker}"
+                  + (f"  ({throttled} upstream 429s)" if throttled else ""))
+            for error in summary["errors"][:3]:
+                print(f"{'':>9} {error[:160]}")
+    finally:
+        if pool is not None:
+            pool.drain()
+    if saturation:
+        print(f"Throughput stopped scaling at {saturation} concurrent sessions (peak {best:.2f} turns/s)")
+    else:
+        print(f"No saturation within the tested levels (peak {best:.2f} turns/s)")
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,13 @@
 import operator
 import os
+import threading
 from typing import TypedDict, Annotated, Sequence, Dict
-from langchain_openai import AzureChatOpenAI, AzureOpenAIEmbeddings
 from langchain_core.messages import BaseMessage
-from tools.ragSearch import AzureSearchVector
-from dotenv import load_dotenv  
+from dotenv import load_dotenv
 
 load_dotenv()
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "azure") # "azure" for Azure AI Search, "local" for the offline SQLite index
+LOCAL_VECTOR_DB_PATH = os.getenv("LOCAL_VECTOR_DB_PATH", "vector_index.db")
 
 class MultiAgentState(TypedDict):
     "State shared across all agents in the system."
@@ -15,28 +16,77 @@ class MultiAgentState(TypedDict):
     final_response: str  # Final answer to return to user
     task_context: dict  # Additional context passed between agents such as which tools are available on each agent
 
-# Initialize Azure OpenAI LLM
-llm = AzureChatOpenAI(
-    azure_endpoint = os.getenv("AZURE_OPENAI_ENDPOINT"),
-    api_key = os.getenv("AZURE_OPENAI_API_KEY"),
-    azure_deployment = os.getenv("AZURE_OPENAI_DEPLOYMENT"),
-    api_version = os.getenv("AZURE_OPENAI_API_VERSION"),
-    temperature = 0.7
-)
-
-# Initialize Azure OpenAI Embeddings
-embeddings = AzureOpenAIEmbeddings(
-    azure_endpoint = os.getenv("AZURE_EMBEDDINGS_ENDPOINT"),
-    api_key = os.getenv("AZURE_EMBEDDINGS_API_KEY"),
-    azure_deployment = os.getenv("AZURE_EMBEDDINGS_DEPLOYMENT"),
-    api_version = os.getenv("AZURE_EMBEDDINGS_API_VERSION")
-)      
-# Initialize vector store
-vector_store = AzureSearchVector(
-    index_name = os.getenv("AZURE_SEARCH_INDEX_NAME"),
-    endpoint = os.getenv("AZURE_SEARCH_ENDPOINT"),
-    key = os.getenv("AZURE_SEARCH_KEY"),
-    embeddings=embeddings,
-    vector_field="text_vector",
-    text_field="chunk",  
-)
\ No newline at end of file
+# Azure clients are built on first use so importing this module needs neither network access nor the heavy SDK imports
+_clients = {}
+_clients_lock = threading.RLock() # Re-entrant: the vector store's builder asks for the embeddings while the lock is held
+
+def _get_client(name, build):
+    client = _clients.get(name)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(name)
+            if client is None:
+                client = _clients[name] = build()
+    return client
+
+def _build_llm():
+    from langchain_openai import AzureChatOpenAI
+    return AzureChatOpenAI(
+        azure_endpoint = os.getenv("AZURE_OPENAI_ENDPOINT"),
+        api_key = os.getenv("AZURE_OPENAI_API_KEY"),
+        azure_deployment = os.getenv("AZURE_OPENAI_DEPLOYMENT"),
+        api_version = os.getenv("AZURE_OPENAI_API_VERSION"),
+        temperature = 0.7
+    )
+
+def _build_embeddings():
+    from langchain_openai import AzureOpenAIEmbeddings
+    from common.embedding_batcher import BatchedEmbeddings
+    # Concurrent embed_query calls arriving within the batch window share one embed_documents request; a window of 0 disables batching
+    return BatchedEmbeddings(
+        AzureOpenAIEmbeddings(
+            azure_endpoint = os.getenv("AZURE_EMBEDDINGS_ENDPOINT"),
+            api_key = os.getenv("AZURE_EMBEDDINGS_API_KEY"),
+            azure_deployment = os.getenv("AZURE_EMBEDDINGS_DEPLOYMENT"),
+            api_version = os.getenv("AZURE_EMBEDDINGS_API_VERSION"),
+            # Token-length checks need tiktoken's encoding files; turn off to run fully offline (e.g. against the emulator)
+            check_embedding_ctx_length = os.getenv("AZURE_EMBEDDINGS_CHECK_CTX_LENGTH", "true").lower() == "true"
+        ),
+        max_batch_size = int(os.getenv("EMBEDDINGS_MAX_BATCH_SIZE", "16")),
+        max_wait_ms = float(os.getenv("EMBEDDINGS_BATCH_WINDOW_MS", "5")),
+    )
+
+def _build_vector_store():
+    if VECTOR_BACKEND == "local":
+        from tools.localVector import LocalSearchVector
+        return LocalSearchVector(LOCAL_VECTOR_DB_PATH, get_embeddings())
+    from tools.ragSearch import AzureSearchVector
+    # The connection is checked on the first search rather than here
+    return AzureSearchVector(
+        index_name = os.getenv("AZURE_SEARCH_INDEX_NAME"),
+        endpoint = os.getenv("AZURE_SEARCH_ENDPOINT"),
+        key = os.getenv("AZURE_SEARCH_KEY"),
+        embeddings=get_embeddings(),
+        vector_field="text_vector",
+        text_field="chunk",
+        key_field=os.getenv("AZURE_SEARCH_KEY_FIELD", "chunk_id"),
+    )
+
+def get_llm():
+    "Shared Azure OpenAI chat model, created on first use."
+    return _get_client("llm", _build_llm)
+
+def get_embeddings():
+    "Shared Azure OpenAI embeddings (micro-batched), created on first use."
+    return _get_client("embeddings", _build_embeddings)
+
+def get_vector_store():
+    "Shared vector store for the configured backend, created on first use."
+    return _get_client("vector_store", _build_vector_store)
+
+def __getattr__(name):
+    # Keeps `from common.common import llm` working for scripts; the client is only built when the name is imported
+    getters = {"llm": get_llm, "embeddings": get_embeddings, "vector_store": get_vector_store}
+    if name in getters:
+        return getters[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
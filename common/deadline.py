@@ -0,0 +1,122 @@
+import os
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar, copy_context
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dotenv import load_dotenv
+load_dotenv()
+
+TURN_DEADLINE_SECONDS = float(os.getenv("TURN_DEADLINE_SECONDS", "60"))
+# Hedging sends a duplicate of a slow idempotent call (embeddings, search, routing) once it runs past the p95 latency
+HEDGE_IDEMPOTENT_CALLS = os.getenv("HEDGE_IDEMPOTENT_CALLS", "false").lower() == "true"
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "0.95"))
+HEDGE_MIN_SAMPLES = 20 # No hedging until there is enough latency history for a meaningful percentile
+# Threads that run every deadlined LLM, search, embedding and tool call. Sized to the process's concurrent turns (a turn rarely has
+# more than a few calls in flight) so calls never queue here, since queueing time is charged to the turn's budget
+DEADLINE_POOL_SIZE = int(os.getenv("DEADLINE_POOL_SIZE", str(4 * int(os.getenv("WORKER_THREADS", "8")))))
+
+class DeadlineExceeded(TimeoutError):
+    "Raised when a turn runs out of its time budget."
+
+# The turn deadline for code that cannot see graph state (tools, vector search); nodes read it from task_context
+current_deadline = ContextVar("current_deadline", default=None)
+
+_executor = ThreadPoolExecutor(max_workers=DEADLINE_POOL_SIZE, thread_name_prefix="deadline")
+_latencies = {} # call name -> recent latencies in seconds
+_lock = threading.Lock()
+hedge_metrics = {"hedged": 0, "hedge_wins": 0}
+
+def new_deadline(seconds: float = TURN_DEADLINE_SECONDS) -> float:
+    "Absolute wall-clock deadline, so it survives being checkpointed in task_context."
+    return time.time() + seconds
+
+def remaining_budget(deadline=None):
+    "Seconds left before the deadline, or None when no deadline applies."
+    if deadline is None:
+        deadline = current_deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.time()
+
+def _record_latency(name, seconds):
+    with _lock:
+        _latencies.setdefault(name, deque(maxlen=200)).append(seconds)
+
+def _hedge_delay(name):
+    # Delay before sending a duplicate request, or None when this call is not hedged
+    if not name or not HEDGE_IDEMPOTENT_CALLS:
+        return None
+    with _lock:
+        samples = sorted(_latencies.get(name, ()))
+    if len(samples) < HEDGE_MIN_SAMPLES:
+        return None
+    return samples[min(int(len(samples) * HEDGE_PERCENTILE), len(samples) - 1)]
+
+def _submit(fn, args, kwargs):
+    # Each attempt gets its own copy of the caller's context so nested calls still see the deadline
+    return _executor.submit(copy_context().run, fn, *args, **kwargs)
+
+def call_with_deadline(fn, *args, deadline=None, hedge=None, **kwargs):
+    "Run fn within the remaining turn budget, optionally hedged, raising DeadlineExceeded when the budget runs out."
+    if deadline is None:
+        deadline = current_deadline.get()
+    budget = remaining_budget(deadline)
+    if budget is not None and budget <= 0:
+        raise DeadlineExceeded("Turn deadline exceeded before the call started")
+    if budget is None and not _hedge_delay(hedge):
+        # Nothing to enforce - call inline and just keep the latency history up to date
+        started = time.monotonic()
+        result = fn(*args, **kwargs)
+        if hedge:
+            _record_latency(hedge, time.monotonic() - started)
+        return result
+
+    started = time.monotonic()
+    hedge_delay = _hedge_delay(hedge)
+    primary = _submit(fn, args, kwargs)
+    pending = {primary}
+    error = None
+    while pending:
+        budget = remaining_budget(deadline)
+        if budget is not None and budget <= 0:
+            break
+        timeout = budget
+        if hedge_delay is not None:
+            until_hedge = max(started + hedge_delay - time.monotonic(), 0)
+            timeout = until_hedge if timeout is None else min(timeout, until_hedge)
+        done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                for other in pending:
+                    other.cancel()
+                if hedge:
+                    _record_latency(hedge, time.monotonic() - started)
+                    if future is not primary:
+                        with _lock:
+                            hedge_metrics["hedge_wins"] += 1
+                return future.result()
+            error = future.exception()
+        if hedge_delay is not None and time.monotonic() >= started + hedge_delay:
+            # The call is slower than usual - race a duplicate against it and take whichever answers first
+            pending.add(_submit(fn, args, kwargs))
+            hedge_delay = None
+            with _lock:
+                hedge_metrics["hedged"] += 1
+    if not pending and error is not None:
+        raise error
+    for future in pending:
+        future.cancel()
+    raise DeadlineExceeded(f"Turn deadline exceeded while waiting for {getattr(fn, '__name__', 'call')}")
+
+def invoke_with_deadline(llm, messages, deadline=None, hedge=None):
+    "Invoke an LLM (or tool-bound LLM) within the remaining budget, passing it down as the request timeout."
+    budget = remaining_budget(deadline)
+    if budget is None:
+        return call_with_deadline(llm.invoke, messages, deadline=deadline, hedge=hedge)
+    # The request timeout makes the HTTP client give up too, instead of leaving an abandoned call running
+    return call_with_deadline(llm.invoke, messages, deadline=deadline, hedge=hedge, timeout=max(budget, 0.001))
+
+def state_deadline(state):
+    "The turn deadline carried in task_context."
+    return state.get("task_context", {}).get("deadline")
@@ -0,0 +1,98 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from langchain_core.embeddings import Embeddings
+from common.deadline import call_with_deadline, remaining_budget, DeadlineExceeded
+
+class BatchedEmbeddings(Embeddings):
+    "Coalesces concurrent embed_query calls into batched embed_documents requests."
+
+    def __init__(self, embeddings, max_batch_size: int = 16, max_wait_ms: float = 5, max_concurrent_batches: int = 4):
+        self.embeddings = embeddings # The wrapped AzureOpenAIEmbeddings
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.cond = threading.Condition()
+        self.queue = [] # (text, enqueued_at) waiting for the next batch
+        self.in_flight = {} # text -> Future, shared by every caller asking for the same text
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrent_batches, thread_name_prefix="embed-batch")
+        self.collector = None
+        self.metrics = {"requests": 0, "deduplicated": 0, "batches": 0, "batched_texts": 0, "queue_wait_ms_total": 0.0, "queue_wait_ms_max": 0.0}
+
+    def embed_documents(self, texts):
+        # Callers that already batch (e.g. ingestion) go straight through
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text: str):
+        if self.max_wait <= 0:
+            return call_with_deadline(self.embeddings.embed_query, text, hedge="embeddings")
+        with self.cond:
+            self.metrics["requests"] += 1
+            future = self.in_flight.get(text)
+            if future is not None:
+                self.metrics["deduplicated"] += 1
+            else:
+                future = Future()
+                self.in_flight[text] = future
+                self.queue.append((text, time.monotonic()))
+                if self.collector is None:
+                    self.collector = threading.Thread(target=self._collect, name="embed-collector", daemon=True)
+                    self.collector.start()
+                self.cond.notify()
+        # Never wait past the turn deadline, even if the batch is lost
+        budget = remaining_budget()
+        try:
+            return list(future.result(timeout=None if budget is None else max(budget, 0)))
+        except TimeoutError as e:
+            if future.done():
+                raise
+            raise DeadlineExceeded("Turn deadline exceeded while waiting for a batched embedding") from e
+
+    def _collect(self):
+        # Wait for the first request, then gather more until the window closes or the batch is full
+        while True:
+            with self.cond:
+                while not self.queue:
+                    self.cond.wait()
+                window_end = self.queue[0][1] + self.max_wait
+                while len(self.queue) < self.max_batch_size:
+                    remaining = window_end - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.cond.wait(remaining)
+                batch = self.queue[:self.max_batch_size]
+                del self.queue[:self.max_batch_size]
+                now = time.monotonic()
+                waits = [(now - enqueued_at) * 1000 for _, enqueued_at in batch]
+                self.metrics["batches"] += 1
+                self.metrics["batched_texts"] += len(batch)
+                self.metrics["queue_wait_ms_total"] += sum(waits)
+                self.metrics["queue_wait_ms_max"] = max(self.metrics["queue_wait_ms_max"], max(waits))
+            # Send the batch without holding the collector so the next window can fill meanwhile
+            self.executor.submit(self._embed_batch, [text for text, _ in batch])
+
+    def _embed_batch(self, texts):
+        try:
+            # Embedding requests are idempotent, so a slow batch may be hedged with a duplicate request
+            vectors = call_with_deadline(self.embeddings.embed_documents, texts, hedge="embeddings")
+        except Exception as e:
+            vectors, error = None, e
+        else:
+            error = None
+            if len(vectors) != len(texts):
+                # Resolve every waiter with the error instead of leaving the rest of the batch blocked forever
+                vectors, error = None, ValueError(f"Embedding service returned {len(vectors)} vectors for {len(texts)} texts")
+        with self.cond:
+            futures = [self.in_flight.pop(text) for text in texts]
+        for i, future in enumerate(futures):
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(vectors[i])
+
+    def stats(self):
+        "Batch-size and queue-wait metrics so far."
+        with self.cond:
+            metrics = dict(self.metrics)
+        metrics["avg_batch_size"] = metrics["batched_texts"] / metrics["batches"] if metrics["batches"] else 0.0
+        metrics["avg_queue_wait_ms"] = metrics["queue_wait_ms_total"] / metrics["batched_texts"] if metrics["batched_texts"] else 0.0
+        return metrics
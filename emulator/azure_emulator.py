@@ -0,0 +1,362 @@
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+import numpy as np
+
+# Local stand-in for the subset of Azure OpenAI (chat completions incl. tool calls and streaming, embeddings)
+# and Azure AI Search (vector query, document upload) used by common/common.py and tools/ragSearch.py.
+# Point AZURE_OPENAI_ENDPOINT, AZURE_EMBEDDINGS_ENDPOINT and AZURE_SEARCH_ENDPOINT at http://127.0.0.1:<port>.
+
+CHAT_PATH = re.compile(r"^/openai/deployments/[^/]+/chat/completions$")
+EMBEDDINGS_PATH = re.compile(r"^/openai/deployments/[^/]+/embeddings$")
+SEARCH_PATH = re.compile(r"^/indexes\('([^']+)'\)/docs/search\.post\.search$|^/indexes/([^/]+)/docs/search$")
+INDEX_PATH = re.compile(r"^/indexes\('([^']+)'\)/docs/search\.index$|^/indexes/([^/]+)/docs/index$")
+MATH_EXPRESSION = re.compile(r"[\d\.\s\(\)]+(?:[\+\-\*/%]+[\d\.\s\(\)]+)+")
+SAMPLE_TOPICS = ["Azure OpenAI", "vector search", "LangGraph", "multi-agent planning", "chat memory", "rate limits", "embeddings", "latency budgets"]
+
+# Latency and fault injection ---------------------------------------------------------------------------------------------------------------------
+class LatencyModel:
+    "Samples a delay in seconds from 'fixed:MS', 'uniform:LOW:HIGH', 'normal:MEAN:SD' or 'lognormal:MEDIAN:SIGMA' (milliseconds)."
+
+    def __init__(self, spec: str = "fixed:0"):
+        kind, *params = spec.split(":")
+        self.kind = kind
+        self.params = [float(p) for p in params]
+        if kind not in ("fixed", "uniform", "normal", "lognormal"):
+            raise ValueError(f"Unknown latency distribution: {spec}")
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "fixed":
+            ms = self.params[0]
+        elif self.kind == "uniform":
+            ms = rng.uniform(self.params[0], self.params[1])
+        elif self.kind == "normal":
+            ms = rng.gauss(self.params[0], self.params[1])
+        else:
+            ms = rng.lognormvariate(np.log(self.params[0]), self.params[1])
+        return max(ms, 0) / 1000
+
+def fake_embedding(text: str, dimensions: int):
+    "Deterministic unit vector for a text, so identical texts always embed identically."
+    seed = int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+    vector = np.random.default_rng(seed).standard_normal(dimensions).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+# Emulator state -----------------------------------------------------------------------------------------------------------------------------------------
+class EmulatorState:
+    "Configuration, in-memory search index and request counters shared by all handler threads."
+
+    def __init__(self, latency=None, error_rate=None, script=None, dimensions=1536, documents=50, stream_chunk_ms=5, seed=None):
+        self.latency = {name: LatencyModel(spec) for name, spec in (latency or {}).items()}
+        self.error_rate = error_rate or {}
+        self.script = script or [] # [{"match": regex, "content": str, "tool_calls": [{"name": ..., "arguments": {...}}]}]
+        self.dimensions = dimensions
+        self.stream_chunk_ms = stream_chunk_ms
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.indexes = {} # index name -> {key: document}
+        self.stats = {}
+        self.sample_documents = [
+            f"Internal note {i}: {SAMPLE_TOPICS[i % len(SAMPLE_TOPICS)]} guidance, revision {i}. "
+            f"Keep requests batched and retries bounded when working with {SAMPLE_TOPICS[(i * 3) % len(SAMPLE_TOPICS)]}."
+            for i in range(documents)
+        ]
+
+    def delay_and_fault(self, endpoint: str) -> bool:
+        "Sleep for the endpoint's sampled latency; return True if this request should get a 429."
+        with self.lock:
+            delay = self.latency[endpoint].sample(self.rng) if endpoint in self.latency else 0.0
+            throttled = self.rng.random() < self.error_rate.get(endpoint, 0.0)
+            counters = self.stats.setdefault(endpoint, {"requests": 0, "throttled": 0})
+            counters["requests"] += 1
+            counters["throttled"] += int(throttled)
+        time.sleep(delay)
+        return throttled
+
+    def index(self, name: str, key_field: str = "chunk_id", text_field: str = "chunk", vector_field: str = "text_vector"):
+        with self.lock:
+            if name not in self.indexes:
+                # Seed a new index with sample documents so searches return something out of the box
+                self.indexes[name] = {
+                    f"sample-{i}": {key_field: f"sample-{i}", text_field: text, vector_field: fake_embedding(text, self.dimensions)}
+                    for i, text in enumerate(self.sample_documents)
+                }
+            return self.indexes[name]
+
+# Scripted and default chat behaviour -----------------------------------------------------------------------------------------------------------
+def _text(content):
+    if isinstance(content, list):
+        return " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content or ""
+
+def default_route(query: str) -> str:
+    # Mimics the orchestrator prompt: several capabilities -> planner, otherwise the single matching agent
+    lowered = query.lower()
+    needs = []
+    if re.search(r"research|search|find|look up|latest", lowered):
+        needs.append("RESEARCH_AGENT")
+    if MATH_EXPRESSION.search(query) or re.search(r"calculate|compute|growth rate", lowered):
+        needs.append("MATH_AGENT")
+    if "summar" in lowered:
+        needs.append("SUMMARY_AGENT")
+    if len(needs) > 1:
+        return "PLANNER_AGENT"
+    return needs[0] if needs else "GENERAL_AGENT"
+
+def default_plan(query: str) -> str:
+    lowered = query.lower()
+    steps = []
+    if re.search(r"research|search|find|look up|latest", lowered):
+        steps.append(f"Look up background for: {query} -> RESEARCH_AGENT")
+    if MATH_EXPRESSION.search(query) or re.search(r"calculate|compute|growth rate", lowered):
+        steps.append("Calculate the requested figures -> MATH_AGENT")
+    if "summar" in lowered:
+        steps.append("Summarize the findings -> SUMMARY_AGENT")
+    steps = steps or [f"Answer {query} -> GENERAL_AGENT"]
+    return "\n".join(f"STEP {i}: {step}" for i, step in enumerate(steps, 1))
+
+def default_tool_call(tool: dict, user_text: str) -> dict:
+    # Fill every string parameter of the first tool from the user's message
+    function = tool.get("function", {})
+    properties = function.get("parameters", {}).get("properties", {})
+    arguments = {}
+    for name, schema in properties.items():
+        if schema.get("type") != "string":
+            continue
+        match = MATH_EXPRESSION.search(user_text) if name == "expression" else None
+        arguments[name] = match.group(0).strip() if match else user_text
+    return {"name": function.get("name", "tool"), "arguments": arguments}
+
+def chat_reply(state: EmulatorState, body: dict):
+    "Return (content, tool_calls) for a chat request: scripted rules first, then defaults that drive the real graph."
+    messages = body.get("messages", [])
+    system_text = " ".join(_text(m.get("content")) for m in messages if m.get("role") == "system")
+    user_texts = [_text(m.get("content")) for m in messages if m.get("role") == "user"]
+    user_text = user_texts[-1] if user_texts else ""
+    last = messages[-1] if messages else {}
+    tools = body.get("tools") or []
+    for rule in state.script:
+        if re.search(rule.get("match", ""), user_text + "\n" + system_text, re.IGNORECASE | re.DOTALL):
+            return rule.get("content"), rule.get("tool_calls")
+    if system_text.startswith("Analyze this query and decide routing"):
+        query = system_text.rsplit("Query:", 1)[-1].strip()
+        return default_route(query), None
+    if "Planner Agent" in system_text:
+        return default_plan(user_text), None
+    if tools and last.get("role") == "user":
+        return None, [default_tool_call(tools[0], user_text)]
+    if last.get("role") == "tool":
+        return f"Based on the tool output: {_text(last.get('content'))[:300]}", None
+    if "coordinator" in system_text.lower():
+        return "Final answer (emulated): " + _text(last.get("content"))[-400:], None
+    return f"Emulated response to: {user_text[:200]}", None
+
+# HTTP handler --------------------------------------------------------------------------------------------------------------------------------------
+class EmulatorHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1" # Keep-alive, like the real services
+    state: EmulatorState = None
+
+    def log_message(self, format, *args):
+        pass # Request logging would dominate the output under load
+
+    def handle(self):
+        try:
+            super().handle()
+        except (BrokenPipeError, ConnectionResetError):
+            pass # The client gave up (e.g. hit its turn deadline) before the response was written
+
+    def _send_json(self, status: int, payload: dict, headers=None):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _throttle(self):
+        self._send_json(429, {"error": {"code": "429", "message": "Rate limit is exceeded. Try again in 1 seconds."}}, {"Retry-After": "1", "retry-after-ms": "1000"})
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_GET(self):
+        if urlparse(self.path).path == "/emulator/stats":
+            with self.state.lock:
+                stats = json.loads(json.dumps(self.state.stats))
+            return self._send_json(200, stats)
+        self._send_json(404, {"error": {"code": "NotFound", "message": self.path}})
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        body = self._read_body()
+        if CHAT_PATH.match(path):
+            return self._chat(body)
+        if EMBEDDINGS_PATH.match(path):
+            return self._embeddings(body)
+        match = SEARCH_PATH.match(path)
+        if match:
+            return self._search(match.group(1) or match.group(2), body)
+        match = INDEX_PATH.match(path)
+        if match:
+            return self._index(match.group(1) or match.group(2), body)
+        self._send_json(404, {"error": {"code": "NotFound", "message": path}})
+
+    def _chat(self, body):
+        if self.state.delay_and_fault("chat"):
+            return self._throttle()
+        content, tool_calls = chat_reply(self.state, body)
+        calls = [
+            {"id": f"call_{uuid.uuid4().hex[:24]}", "type": "function", "function": {"name": call["name"], "arguments": json.dumps(call.get("arguments", {}))}}
+            for call in (tool_calls or [])
+        ]
+        finish_reason = "tool_calls" if calls else "stop"
+        prompt_tokens = sum(len(_text(m.get("content")).split()) for m in body.get("messages", []))
+        completion_tokens = len((content or "").split()) + 10 * len(calls)
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "total_tokens": prompt_tokens + completion_tokens}
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        if body.get("stream"):
+            return self._stream_chat(completion_id, content, calls, finish_reason, usage)
+        message = {"role": "assistant", "content": content}
+        if calls:
+            message["tool_calls"] = calls
+        self._send_json(200, {
+            "id": completion_id, "object": "chat.completion", "created": int(time.time()), "model": "gpt-4o-emulated",
+            "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+            "usage": usage,
+        })
+
+    def _stream_chat(self, completion_id, content, calls, finish_reason, usage):
+        # Server-sent events: role first, then content words or tool-call deltas, then the finish reason
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def event(delta, finish=None):
+            chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": "gpt-4o-emulated",
+                     "choices": [{"index": 0, "delta": delta, "finish_reason": finish}]}
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        event({"role": "assistant", "content": ""})
+        for word in re.findall(r"\S+\s*", content or ""):
+            time.sleep(self.state.stream_chunk_ms / 1000)
+            event({"content": word})
+        for i, call in enumerate(calls):
+            event({"tool_calls": [{"index": i, "id": call["id"], "type": "function", "function": {"name": call["function"]["name"], "arguments": ""}}]})
+            event({"tool_calls": [{"index": i, "function": {"arguments": call["function"]["arguments"]}}]})
+        event({}, finish_reason)
+        usage_chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": "gpt-4o-emulated", "choices": [], "usage": usage}
+        self.wfile.write(f"data: {json.dumps(usage_chunk)}\n\ndata: [DONE]\n\n".encode("utf-8"))
+        self.wfile.flush()
+
+    def _embeddings(self, body):
+        if self.state.delay_and_fault("embeddings"):
+            return self._throttle()
+        inputs = body.get("input", [])
+        if isinstance(inputs, str) or (inputs and isinstance(inputs[0], int)):
+            inputs = [inputs] # A single string or a single token list
+        dimensions = body.get("dimensions") or self.state.dimensions
+        data = [
+            {"object": "embedding", "index": i, "embedding": fake_embedding(item if isinstance(item, str) else json.dumps(item), dimensions).tolist()}
+            for i, item in enumerate(inputs)
+        ]
+        tokens = sum(len(item.split()) if isinstance(item, str) else len(item) for item in inputs)
+        self._send_json(200, {"object": "list", "data": data, "model": "text-embedding-emulated", "usage": {"prompt_tokens": tokens, "total_tokens": tokens}})
+
+    def _search(self, index_name, body):
+        if self.state.delay_and_fault("search"):
+            return self._throttle()
+        vector_queries = body.get("vectorQueries") or []
+        select = [field.strip() for field in (body.get("select") or "").split(",") if field.strip()]
+        vector_field = vector_queries[0].get("fields", "text_vector") if vector_queries else "text_vector"
+        documents = list(self.state.index(index_name, vector_field=vector_field).values())
+        top = body.get("top") or 50
+        if vector_queries:
+            query = np.asarray(vector_queries[0]["vector"], dtype=np.float32)
+            query = query / (np.linalg.norm(query) or 1)
+            scored = sorted(((float(np.dot(doc[vector_field], query)), doc) for doc in documents if vector_field in doc), key=lambda pair: -pair[0])
+            k = vector_queries[0].get("k") or top
+            scored = scored[:min(k, top)]
+        else:
+            scored = [(1.0, doc) for doc in documents[:top]]
+        value = []
+        for score, doc in scored:
+            fields = {name: doc.get(name) for name in select} if select else {name: item for name, item in doc.items() if not isinstance(item, np.ndarray)}
+            value.append({"@search.score": score, **fields})
+        payload = {"value": value}
+        if body.get("count"):
+            payload["@odata.count"] = len(documents)
+        self._send_json(200, payload)
+
+    def _index(self, index_name, body):
+        if self.state.delay_and_fault("index"):
+            return self._throttle()
+        documents = self.state.index(index_name)
+        results = []
+        with self.state.lock:
+            for action in body.get("value", []):
+                kind = action.pop("@search.action", "upload")
+                key_name = next((name for name in ("chunk_id", "id", "key") if name in action), next(iter(action)))
+                key = action[key_name]
+                if kind == "delete":
+                    documents.pop(key, None)
+                else:
+                    doc = documents.get(key, {}) if kind in ("merge", "mergeOrUpload") else {}
+                    doc.update({name: np.asarray(item, dtype=np.float32) if isinstance(item, list) and item and isinstance(item[0], (int, float)) else item for name, item in action.items()})
+                    documents[key] = doc
+                results.append({"key": key, "status": True, "errorMessage": None, "statusCode": 200})
+        self._send_json(200, {"value": results})
+
+def start_emulator(host: str = "127.0.0.1", port: int = 0, **state_options):
+    "Start the emulator on a background thread and return (server, base_url)."
+    handler = type("ConfiguredEmulatorHandler", (EmulatorHandler,), {"state": EmulatorState(**state_options)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="azure-emulator", daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+def _parse_pairs(values, convert):
+    pairs = {}
+    for value in values or []:
+        name, _, setting = value.partition("=")
+        pairs[name] = convert(setting)
+    return pairs
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Azure OpenAI / Azure AI Search emulator.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", action="append", metavar="ENDPOINT=SPEC", help="e.g. chat=lognormal:800:0.4, embeddings=uniform:30:80, search=fixed:40")
+    parser.add_argument("--error-rate", action="append", metavar="ENDPOINT=RATE", help="Fraction of requests answered with 429, e.g. chat=0.05")
+    parser.add_argument("--script", help="JSON file of scripted chat responses: [{match, content, tool_calls}]")
+    parser.add_argument("--dimensions", type=int, default=1536)
+    parser.add_argument("--documents", type=int, default=50, help="Sample documents seeded into each new index")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    script = json.load(open(args.script)) if args.script else None
+    server, url = start_emulator(
+        args.host, args.port, latency=_parse_pairs(args.latency, str), error_rate=_parse_pairs(args.error_rate, float),
+        script=script, dimensions=args.dimensions, documents=args.documents, seed=args.seed
+    )
+    print(f"Azure emulator listening on {url} (stats at {url}/emulator/stats)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -1,22 +1,23 @@
 import os
 import operator
 import sqlite3
-import phoenix as px
+import threading
 from dotenv import load_dotenv  
-from phoenix.otel import register       
 
 from typing import TypedDict, Annotated, Sequence
 from typing_extensions import TypedDict
 
-from langchain_openai import AzureChatOpenAI, AzureOpenAIEmbeddings
 from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage, AIMessage
 
 from langgraph.graph import StateGraph, END
 from langgraph.prebuilt import ToolNode
 
-from memory.memory import get_session_history, clear_session_history, list_sessions
+from memory.memory import get_session_history, clear_session_history, list_sessions, get_turn_index
+from memory.long_term import LONG_TERM_MEMORY, long_term_memory, build_context_messages
+from memory.checkpointer import get_checkpointer, get_turn_config, clear_turn_checkpoints, touch_turn, maybe_prune_checkpoints
 from tools.toolkit import calculate, summarize_text, search_knowledge_base, web_search
-from tools.ragSearch import AzureSearchVector
+from tools.prefetch import kb_prefetcher
+from common.deadline import DeadlineExceeded, new_deadline, current_deadline
 
 from agents.base_agent import BaseAgent
 from agents.math_agent import MathAgent
@@ -27,16 +28,23 @@ from agents.planner_agent import PlannerAgent
 from agents.coordinator_agent import CoordinatorAgent
 
 #Azure Components Initialization - LLM, Embeddings, Vector Store, Memory---------------------------------------------------------------------------
-from common.common import MultiAgentState, llm, embeddings, vector_store # Multi-agent defnition
+# Clients are created on first use, so importing this module is fast and needs no network
+from common.common import MultiAgentState, get_llm, get_embeddings, get_vector_store # Multi-agent defnition
 
 # Monitoring Initialization---------------------------------------------------------------------------------------------------------------
-# os.environ["PHOENIX_WORKING_DIR"] = "./phoenix_data"
-# px.launch_app()
-# tracer_provider = register(
-#   project_name="Azure_LLM_Agent",
-#   endpoint="http://localhost:6006/v1/traces",
-#   auto_instrument=True
-# )
+def setup_tracing():
+    "Start Phoenix tracing; phoenix is only imported when PHOENIX_TRACING=true."
+    if os.getenv("PHOENIX_TRACING", "false").lower() != "true":
+        return None
+    import phoenix as px
+    from phoenix.otel import register
+    # os.environ["PHOENIX_WORKING_DIR"] = "./phoenix_data"
+    # px.launch_app()
+    return register(
+      project_name="Azure_LLM_Agent",
+      endpoint="http://localhost:6006/v1/traces",
+      auto_instrument=True
+    )
 
 # Load environment variables----------------------------------------------------------------------------------------------------------------------
 load_dotenv()
@@ -49,8 +57,9 @@ chat_history = {}
 class MultiAgentSystem:
     "Main multi-agent system coordinating all agents."
     
-    def __init__(self, llm, embeddings, vector_store):
+    def __init__(self, llm, embeddings, vector_store, checkpointer=None):
         self.llm = llm
+        self.checkpointer = checkpointer # Durable graph state so interrupted turns resume from the last completed node
         # Initialize all agents - Everytime you create an agent; add it here
         self.orchestrator = Orchestrator(llm) # Can cahnge the llm models per agent here but we are calling only one now
         self.math_agent = MathAgent(llm)
@@ -147,32 +156,93 @@ class MultiAgentSystem:
             }
         )
         
-        return workflow.compile()
+        return workflow.compile(checkpointer=self.checkpointer)
 
 # INITIALIZING MULTI-AGENT SYSTEM ----------------------------------------------------------------------------------------------------------------------------
-multi_agent_system = MultiAgentSystem(llm, embeddings, vector_store) 
+# Built on the first turn rather than at import so workers start quickly
+multi_agent_system = None
+_multi_agent_system_lock = threading.Lock()
 
-def run_multi_agent(user_input: str, session_id: str = "defaultUser"):
+def get_multi_agent_system():
+    "Get the shared multi-agent system, building it on first use."
+    global multi_agent_system
+    if multi_agent_system is None:
+        with _multi_agent_system_lock:
+            if multi_agent_system is None:
+                multi_agent_system = MultiAgentSystem(get_llm(), get_embeddings(), get_vector_store(), checkpointer=get_checkpointer())
+    return multi_agent_system
+
+def partial_response(config):
+        "Build an answer from the plan steps that completed before the turn deadline."
+        task_context = get_multi_agent_system().app.get_state(config).values.get("task_context", {})
+        plan_results = task_context.get("plan_results", [])
+        if not plan_results:
+            return "Sorry, I ran out of time before I could finish this request. Please try again."
+        partial = "I ran out of time before finishing every step. Here is what I completed:\n"
+        for result in plan_results:
+            partial += f"\nStep {result['step'] + 1}: {result['result']}\n"
+        return partial
+
+def run_multi_agent(user_input: str, session_id: str = "defaultUser", user_id: str = None):
         "Run the multi-agent system with memory."
+        user_id = user_id or session_id # Long-term memory is shared across all sessions of a user
+        multi_agent_system = get_multi_agent_system()
         # Load previous messages
         chat_history = get_session_history(session_id)
         previous_messages = chat_history.messages
+        # Checkpoints are keyed by session and turn; a failed turn is never saved to history so a retry maps to the same turn
+        config = get_turn_config(session_id, get_turn_index(chat_history, previous_messages), user_input)
+        touch_turn(multi_agent_system.checkpointer, config)
+        maybe_prune_checkpoints(multi_agent_system.checkpointer) # Turns abandoned after a timeout are never cleared by completion
+        # Every LLM, tool and search call in this turn gets whatever is left of this budget
+        deadline = new_deadline()
         initial_state = {
             "messages": previous_messages + [HumanMessage(content=user_input)],
             "next_agent": "",
             "final_response": "",
-            "task_context": {"original_query": user_input} # To prevent previous messages from the chat history coming as the original query
+            "task_context": {"original_query": user_input, "deadline": deadline} # To prevent previous messages from the chat history coming as the original query
         }
         # Run the compiled workflow through the multi-agent system
-        result = multi_agent_system.app.invoke(initial_state)
-        # Save to memory
-        chat_history.add_user_message(user_input)
+        # durability="async" writes checkpoints in the background while the next node runs
+        deadline_token = current_deadline.set(deadline) # Tools and vector search cannot see task_context, so they read the deadline from here
+        try:
+            snapshot = multi_agent_system.app.get_state(config)
+            if snapshot.next:
+                # A previous attempt of this turn was interrupted - resume from the last completed node and reuse finished plan steps
+                print(f"\n Resuming interrupted turn at: {', '.join(snapshot.next)}")
+                multi_agent_system.app.update_state(config, {"task_context": {**snapshot.values.get("task_context", {}), "deadline": deadline}})
+                result = multi_agent_system.app.invoke(None, config, durability="async")
+            elif snapshot.values:
+                # The graph finished but the answer never reached the chat history - reuse it instead of paying again
+                result = snapshot.values
+            else:
+                if LONG_TERM_MEMORY:
+                    # Replay only the recent window plus relevant past exchanges so prompt size stays flat as history grows
+                    initial_state["messages"] = build_context_messages(user_id, session_id, previous_messages, user_input) + [HumanMessage(content=user_input)]
+                # Speculatively search the knowledge base on the raw input so retrieval overlaps the routing round trip
+                prefetch_id = kb_prefetcher.start(user_input)
+                initial_state["task_context"]["kb_prefetch_id"] = prefetch_id
+                try:
+                    result = multi_agent_system.app.invoke(initial_state, config, durability="async")
+                finally:
+                    kb_prefetcher.discard(prefetch_id) # Counts as wasted work if no agent consumed it
+        except DeadlineExceeded:
+            # Out of time - answer with whatever plan steps finished; the turn is not saved so asking again resumes it
+            return partial_response(config)
+        finally:
+            current_deadline.reset(deadline_token)
         # Get the final AI message
         final_message = result["messages"][-1]
+        # Save to memory - the whole turn in one write, a single transaction on the Postgres backend
         if hasattr(final_message, 'content'):
-            chat_history.add_ai_message(final_message.content)
+            chat_history.add_messages([HumanMessage(content=user_input), AIMessage(content=final_message.content)])
+            if LONG_TERM_MEMORY:
+                long_term_memory.remember(user_id, session_id, user_input, final_message.content) # Embedded in the background
+            clear_turn_checkpoints(multi_agent_system.checkpointer, config)
             return final_message.content
         
+        chat_history.add_messages([HumanMessage(content=user_input)])
+        clear_turn_checkpoints(multi_agent_system.checkpointer, config)
         return str(final_message)
 
 # ====================================================================================================================================================================================================
@@ -227,13 +297,21 @@ def interactive_cli():
                 else:
                     print("\n Please provide a session name\n")
                 continue
+            elif user_input.lower() == 'status':
+                stats = kb_prefetcher.stats()
+                print(f"\n Knowledge-base prefetch: {stats['started']} started, {stats['hits']} used, "
+                      f"{stats['wasted']} wasted, {stats['cancelled']} cancelled (hit rate {stats['hit_rate']:.0%})")
+                stats = get_embeddings().stats()
+                print(f" Embedding batches: {stats['requests']} queries, {stats['deduplicated']} deduplicated, {stats['batches']} batches "
+                      f"(avg size {stats['avg_batch_size']:.1f}, avg queue wait {stats['avg_queue_wait_ms']:.1f} ms)\n")
+                continue
             elif user_input.lower() == 'sessions':
                 result = get_session_history()
                 continue
             
             # Run the agent
             print(f"\n[{current_session}] Agent: ", end="", flush=True)
-            response = run_multi_agent(user_input, session_id=current_session)
+            response = run_multi_agent(user_input, session_id=current_session, user_id=username)
             print(response)
         
         except KeyboardInterrupt:
@@ -244,5 +322,6 @@ def interactive_cli():
             print(f"\n Error: {e}\n")
 
 if __name__ == "__main__":
+    setup_tracing()
     interactive_cli()
 
@@ -0,0 +1,103 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from langgraph.checkpoint.sqlite import SqliteSaver
+from dotenv import load_dotenv
+load_dotenv()
+
+CHECKPOINT_DB_PATH = "checkpoints.db" # Kept next to chat_history.db so a restarted process can resume interrupted turns
+CHECKPOINT_TTL_SECONDS = float(os.getenv("CHECKPOINT_TTL_SECONDS", str(24 * 3600))) # Abandoned turns older than this are deleted
+CHECKPOINT_PRUNE_INTERVAL_SECONDS = float(os.getenv("CHECKPOINT_PRUNE_INTERVAL_SECONDS", "3600"))
+
+# SqliteSaver stores no timestamps, so turn threads are tracked here for age-based pruning
+CREATE_TURN_THREADS = "CREATE TABLE IF NOT EXISTS turn_threads (thread_id TEXT PRIMARY KEY, last_active REAL NOT NULL)"
+_last_prune = 0.0
+_prune_lock = threading.Lock()
+
+def get_checkpointer(db_path: str = CHECKPOINT_DB_PATH) -> SqliteSaver:
+    "Get a SQLite-backed LangGraph checkpointer tuned for cheap writes."
+    # check_same_thread=False because LangGraph writes checkpoints from its background executor
+    conn = sqlite3.connect(db_path, check_same_thread=False)
+    # WAL lets readers and the writer run concurrently; synchronous=NORMAL skips the fsync on every commit
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    checkpointer = SqliteSaver(conn)
+    checkpointer.setup()
+    with checkpointer.lock:
+        conn.execute(CREATE_TURN_THREADS)
+        conn.commit()
+    return checkpointer
+
+def get_turn_config(session_id: str, turn: int, user_input: str) -> dict:
+    "Build the LangGraph config that keys checkpoints by session and turn."
+    # The query digest stops a retry with a different question from resuming the old turn
+    query_digest = hashlib.sha256(user_input.encode("utf-8")).hexdigest()[:12]
+    return {"configurable": {"thread_id": f"{session_id}:{turn}:{query_digest}"}}
+
+def touch_turn(checkpointer: SqliteSaver, config: dict):
+    "Record that a turn is being (re)tried, so pruning measures age from its latest attempt."
+    with checkpointer.lock:
+        checkpointer.conn.execute(
+            "INSERT OR REPLACE INTO turn_threads (thread_id, last_active) VALUES (?, ?)",
+            (config["configurable"]["thread_id"], time.time())
+        )
+        checkpointer.conn.commit()
+
+def clear_turn_checkpoints(checkpointer: SqliteSaver, config: dict):
+    "Delete the checkpoints of a turn once its answer is safely in the chat history."
+    thread_id = config["configurable"]["thread_id"]
+    try:
+        checkpointer.delete_thread(thread_id)
+        with checkpointer.lock:
+            checkpointer.conn.execute("DELETE FROM turn_threads WHERE thread_id = ?", (thread_id,))
+            checkpointer.conn.commit()
+    except Exception as e:
+        print(f"Error clearing checkpoints: {str(e)}")
+
+def clear_session_checkpoints(session_id: str = None, db_path: str = CHECKPOINT_DB_PATH) -> int:
+    "Delete the checkpoints of every turn in a session (or all sessions) and return how many turns were removed."
+    # Clearing a session restarts its turn positions, so an old abandoned turn could otherwise be resumed with the cleared conversation
+    if not os.path.exists(db_path):
+        return 0
+    conn = sqlite3.connect(db_path)
+    try:
+        thread_ids = [row[0] for row in conn.execute("SELECT DISTINCT thread_id FROM checkpoints UNION SELECT thread_id FROM turn_threads")]
+        if session_id:
+            # Thread ids are "session:turn:digest" and session ids may contain ':' themselves
+            thread_ids = [thread_id for thread_id in thread_ids if thread_id.rsplit(":", 2)[0] == session_id]
+        for table in ("checkpoints", "writes", "turn_threads"):
+            conn.executemany(f"DELETE FROM {table} WHERE thread_id = ?", [(thread_id,) for thread_id in thread_ids])
+        conn.commit()
+        return len(thread_ids)
+    finally:
+        conn.close()
+
+def prune_checkpoints(checkpointer: SqliteSaver, max_age: float = CHECKPOINT_TTL_SECONDS) -> int:
+    "Delete the checkpoints of turns abandoned for longer than max_age seconds and return how many were removed."
+    now = time.time()
+    with checkpointer.lock:
+        # Threads written before tracking existed (or by a crash before touch_turn) start their clock now
+        checkpointer.conn.execute(
+            "INSERT OR IGNORE INTO turn_threads (thread_id, last_active) SELECT DISTINCT thread_id, ? FROM checkpoints", (now,)
+        )
+        checkpointer.conn.commit()
+        expired = [row[0] for row in checkpointer.conn.execute("SELECT thread_id FROM turn_threads WHERE last_active < ?", (now - max_age,))]
+    for thread_id in expired:
+        clear_turn_checkpoints(checkpointer, {"configurable": {"thread_id": thread_id}})
+    return len(expired)
+
+def maybe_prune_checkpoints(checkpointer: SqliteSaver, interval: float = CHECKPOINT_PRUNE_INTERVAL_SECONDS):
+    "Prune expired checkpoints at most once per interval per process; cheap enough to call on every turn."
+    global _last_prune
+    with _prune_lock:
+        if _last_prune and time.monotonic() - _last_prune < interval:
+            return
+        _last_prune = time.monotonic()
+    try:
+        removed = prune_checkpoints(checkpointer)
+        if removed:
+            print(f"Pruned checkpoints of {removed} abandoned turns")
+    except Exception as e:
+        print(f"Error pruning checkpoints: {str(e)}")
@@ -1,25 +1,15 @@
 import os
 from langchain_openai import ChatOpenAI
-from langchain_community.chat_message_histories import PostgresChatMessageHistory
-from langchain.schema import HumanMessage, AIMessage
+from langchain_core.messages import HumanMessage, AIMessage
+from memory.postgres_memory import PostgresChatHistory
 
-# Connection string: "postgresql://<user>:<password>@<host>:5432/<db>?sslmode=require"
-CONNECTION_STRING = os.getenv("AZURE_PG_CONNECTION_STRING")
-
-def get_session_history(session_id: str) -> SQLChatMessageHistory:
-    "Get SQLite-backed chat history for a session."
-    return SQLChatMessageHistory(
-        session_id=session_id,
-        connection=f"sqlite:///{SQLITE_DB_PATH}"
-    )
+# Connection string: "postgresql://<user>:<password>@<host>:5432/<db>?sslmode=require" - read from AZURE_PG_CONNECTION_STRING by memory.postgres_memory
+# The main app uses this backend when MEMORY_BACKEND=postgres
 
 def run_agent_with_memory(session_id: str, user_input: str):
     # 1. Initialize persistent memory in Cosmos DB for PostgreSQL
-    # This automatically creates a 'message_store' table if it doesn't exist
-    history = PostgresChatMessageHistory(
-        connection_string=CONNECTION_STRING,
-        session_id=session_id
-    )
+    # The shared pool creates the 'message_store' table and its (session_id, id) index on first use
+    history = PostgresChatHistory(session_id)
 
     # 2. Initialize the LLM (e.g., Azure OpenAI or GPT-4o)
     llm = ChatOpenAI(model="gpt-4o")
@@ -31,8 +21,7 @@ def run_agent_with_memory(session_id: str, user_input: str):
     response = llm.invoke(messages)
 
     # 5. Persist the interaction to the database
-    history.add_user_message(user_input)
-    history.add_ai_message(response.content)
+    history.add_messages([HumanMessage(content=user_input), AIMessage(content=response.content)])
 
     return response.content
 
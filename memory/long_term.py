@@ -0,0 +1,128 @@
+import hashlib
+import os
+import queue
+import threading
+from dotenv import load_dotenv
+from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
+from common.common import get_embeddings
+from common.deadline import call_with_deadline
+load_dotenv()
+
+LONG_TERM_MEMORY = os.getenv("LONG_TERM_MEMORY", "false").lower() == "true"
+LONG_TERM_DB_PATH = os.getenv("LONG_TERM_DB_PATH", "long_term_memory.db")
+LONG_TERM_TOP_K = int(os.getenv("LONG_TERM_TOP_K", "4"))
+LONG_TERM_TOKEN_BUDGET = int(os.getenv("LONG_TERM_TOKEN_BUDGET", "800")) # Cap on recalled context per turn
+LONG_TERM_RECENT_MESSAGES = int(os.getenv("LONG_TERM_RECENT_MESSAGES", "6")) # Recent messages still replayed verbatim
+
+def estimate_tokens(text: str) -> int:
+    # Roughly four characters per token is close enough for budgeting
+    return len(text) // 4 + 1
+
+class LongTermMemory:
+    "Embeds past exchanges in the background and recalls the most relevant ones for each turn."
+
+    def __init__(self, get_embeddings, db_path=LONG_TERM_DB_PATH, batch_size: int = 32):
+        self.get_embeddings = get_embeddings
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.store = None # Local vector index partitioned by user, opened on first use
+        self.store_lock = threading.Lock()
+        self.queue = queue.Queue()
+        self.worker = None
+        self.worker_lock = threading.Lock()
+        self.backfilled = set() # Sessions whose stored history has already been queued in this process
+
+    def _get_store(self):
+        if self.store is None:
+            with self.store_lock:
+                if self.store is None:
+                    from tools.localVector import LocalSearchVector
+                    self.store = LocalSearchVector(self.db_path, self.get_embeddings())
+        return self.store
+
+    def _enqueue(self, user_id, session_id, human, ai):
+        content = format_exchange(human, ai)
+        # Content-addressed ids make re-queuing the same exchange (e.g. on backfill) a no-op
+        doc_id = hashlib.sha256(f"{user_id}\x00{session_id}\x00{content}".encode("utf-8")).hexdigest()
+        self.queue.put({"id": doc_id, "partition": user_id, "content": content})
+        if self.worker is None:
+            with self.worker_lock:
+                if self.worker is None:
+                    self.worker = threading.Thread(target=self._index_loop, name="long-term-memory", daemon=True)
+                    self.worker.start()
+
+    def remember(self, user_id: str, session_id: str, human: str, ai: str):
+        "Queue a finished exchange for embedding; returns immediately."
+        self._enqueue(user_id, session_id, human, ai)
+
+    def backfill(self, user_id: str, session_id: str, messages):
+        "Queue the exchanges already stored for a session, once per session per process; already indexed ones are not re-embedded."
+        if (user_id, session_id) in self.backfilled:
+            return
+        self.backfilled.add((user_id, session_id))
+        for human, ai in iter_exchanges(messages):
+            self._enqueue(user_id, session_id, human, ai)
+
+    def _index_loop(self):
+        # Embed whatever has queued up in one embed_documents call per batch
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                store = self._get_store()
+                # Backfill re-queues whole sessions after every restart; skip exchanges already indexed so they are not embedded again
+                existing = store.existing_ids(doc["id"] for doc in batch)
+                batch = [doc for doc_id, doc in {doc["id"]: doc for doc in batch}.items() if doc_id not in existing]
+                if not batch:
+                    continue
+                vectors = self.get_embeddings().embed_documents([doc["content"] for doc in batch])
+                store.upload_documents([dict(doc, vector=vector) for doc, vector in zip(batch, vectors)])
+            except Exception as e:
+                print(f"Error indexing long-term memory: {str(e)}")
+
+    def recall(self, user_id: str, query: str, k: int = LONG_TERM_TOP_K, token_budget: int = LONG_TERM_TOKEN_BUDGET, exclude=()) -> str:
+        "Most relevant past exchanges for this user across all sessions, within the token budget."
+        try:
+            vector = call_with_deadline(self.get_embeddings().embed_query, query)
+            docs = self._get_store().similarity_search_by_vector(vector, k=k + len(exclude), partition=user_id)
+        except Exception as e:
+            print(f"Error recalling long-term memory: {str(e)}")
+            return ""
+        recalled, used = [], 0
+        for doc in docs:
+            if doc.page_content in exclude:
+                continue
+            if len(recalled) == k:
+                break
+            tokens = estimate_tokens(doc.page_content)
+            if used + tokens > token_budget:
+                break
+            recalled.append(doc.page_content)
+            used += tokens
+        return "\n\n".join(recalled)
+
+def format_exchange(human: str, ai: str) -> str:
+    return f"User: {human}\nAssistant: {ai}"
+
+def iter_exchanges(messages):
+    "Yield (human, ai) contents for each user message directly answered by the assistant."
+    for previous, message in zip(messages, messages[1:]):
+        if isinstance(previous, HumanMessage) and isinstance(message, AIMessage):
+            yield previous.content, message.content
+
+def build_context_messages(user_id: str, session_id: str, previous_messages, user_input: str):
+    "Recent messages plus recalled past exchanges, instead of replaying the whole history."
+    long_term_memory.backfill(user_id, session_id, previous_messages)
+    recent = list(previous_messages[-LONG_TERM_RECENT_MESSAGES:]) if LONG_TERM_RECENT_MESSAGES else []
+    # Exchanges already in the recent window would only repeat themselves
+    in_window = {format_exchange(human, ai) for human, ai in iter_exchanges(recent)}
+    recalled = long_term_memory.recall(user_id, user_input, exclude=in_window)
+    if not recalled:
+        return recent
+    return [SystemMessage(content=f"Relevant past conversations with this user:\n\n{recalled}")] + recent
+
+long_term_memory = LongTermMemory(get_embeddings)
@@ -1,19 +1,55 @@
+import os
 import sqlite3
-from langchain_core.chat_history import InMemoryChatMessageHistory
-from langchain_community.chat_message_histories import SQLChatMessageHistory
+import threading
+from langchain_core.chat_history import InMemoryChatMessageHistory, BaseChatMessageHistory
+from dotenv import load_dotenv
+load_dotenv()
 
 SQLITE_DB_PATH ="chat_history.db"
+MEMORY_BACKEND = os.getenv("MEMORY_BACKEND", "sqlite") # "sqlite" for a single local process, "postgres" for several workers sharing one database
 
-def get_session_history(session_id: str) -> SQLChatMessageHistory:
-    "Get SQLite-backed chat history for a session."
+_sqlite_engine = None # One engine (and connection pool) for every session instead of one per turn
+_sqlite_engine_lock = threading.Lock()
+
+def get_session_history(session_id: str) -> BaseChatMessageHistory:
+    "Get chat history for a session from the configured backend."
+    if MEMORY_BACKEND == "postgres":
+        from memory.postgres_memory import PostgresChatHistory # Deferred - only Postgres deployments need psycopg
+        return PostgresChatHistory(session_id)
+    from langchain_community.chat_message_histories import SQLChatMessageHistory # Deferred - pulls in SQLAlchemy
+    global _sqlite_engine
+    if _sqlite_engine is None:
+        with _sqlite_engine_lock:
+            if _sqlite_engine is None:
+                from sqlalchemy import create_engine
+                engine = create_engine(f"sqlite:///{SQLITE_DB_PATH}")
+                # The first history creates the table; doing it once here stops concurrent first turns racing on CREATE TABLE
+                SQLChatMessageHistory(session_id=session_id, connection=engine)
+                _sqlite_engine = engine
     return SQLChatMessageHistory(
         session_id=session_id,
-        connection=f"sqlite:///{SQLITE_DB_PATH}"
+        connection=_sqlite_engine
     )
 
+def get_turn_index(chat_history: BaseChatMessageHistory, previous_messages) -> int:
+    "Position of the next turn in a session, independent of how much of the history was loaded."
+    if MEMORY_BACKEND == "postgres":
+        return chat_history.last_message_id() # .messages is capped at CHAT_HISTORY_WINDOW, so its length stops growing
+    return len(previous_messages) # The SQLite history loads every message
+
 def clear_session_history(session_id: str = None):
     "Clear chat history for a specific session or all sessions."
     try:
+        from memory.checkpointer import clear_session_checkpoints # Deferred - pulls in LangGraph
+        clear_session_checkpoints(session_id)
+        if MEMORY_BACKEND == "postgres":
+            from memory.postgres_memory import delete_messages
+            rows_deleted = delete_messages(session_id)
+            if not session_id:
+                return f"Cleared all chat histories ({rows_deleted} messages)"
+            if rows_deleted > 0:
+                return f"Cleared {rows_deleted} messages for session: {session_id}"
+            return f"No history for session: {session_id}"
         conn = sqlite3.connect(SQLITE_DB_PATH)
         cursor = conn.cursor() # Needed to execute the SQL commands
         if session_id:
@@ -39,6 +75,9 @@ def clear_session_history(session_id: str = None):
 def list_sessions():
     "List all available sessions in the database."
     try:
+        if MEMORY_BACKEND == "postgres":
+            from memory.postgres_memory import session_summaries
+            return _format_sessions(session_summaries())
         conn = sqlite3.connect(SQLITE_DB_PATH)
         cursor = conn.cursor()
         
@@ -52,14 +91,17 @@ def list_sessions():
         
         sessions = cursor.fetchall()
         conn.close()
-        
-        if not sessions:
-            return "No sessions found in database."
-        
-        result = "\nAvailable sessions:\n" + "="*50 + "\n"
-        for session_id, count, first_id, last_id in sessions:
-            result += f"  - {session_id}: {count} messages\n"
-        
-        return result
+        return _format_sessions(sessions)
     except Exception as e:
-        return f"Error listing sessions: {str(e)}"
\ No newline at end of file
+        return f"Error listing sessions: {str(e)}"
+
+def _format_sessions(sessions):
+    # Same listing for both backends
+    if not sessions:
+        return "No sessions found in database."
+    
+    result = "\nAvailable sessions:\n" + "="*50 + "\n"
+    for session_id, count, first_id, last_id in sessions:
+        result += f"  - {session_id}: {count} messages\n"
+    
+    return result
\ No newline at end of file
@@ -0,0 +1,275 @@
+import argparse
+import bisect
+import hashlib
+import importlib
+import multiprocessing as mp
+import os
+import queue
+import signal
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dotenv import load_dotenv
+load_dotenv()
+
+WORKER_COUNT = int(os.getenv("WORKER_COUNT", str(os.cpu_count() or 1)))
+WORKER_THREADS = int(os.getenv("WORKER_THREADS", "8")) # Concurrent sessions per worker; turns are mostly waiting on Azure
+HEALTH_CHECK_INTERVAL = float(os.getenv("HEALTH_CHECK_INTERVAL", "5"))
+HEALTH_CHECK_TIMEOUT = float(os.getenv("HEALTH_CHECK_TIMEOUT", "30")) # A worker silent for this long is restarted
+# Pongs come from the worker's main loop, so they cannot show handler threads that hang; a turn running this long means a stuck worker.
+# Turns normally end by their deadline, so the default leaves plenty of slack
+STUCK_REQUEST_TIMEOUT = float(os.getenv("STUCK_REQUEST_TIMEOUT", str(3 * float(os.getenv("TURN_DEADLINE_SECONDS", "60")))))
+DEFAULT_HANDLER = "main:run_multi_agent"
+
+# Session routing -----------------------------------------------------------------------------------------------------------------------------------
+class ConsistentHashRing:
+    "Maps session ids to worker slots so a session always lands on the same worker."
+
+    def __init__(self, slots, replicas: int = 100):
+        # Virtual nodes spread each slot around the ring for an even split
+        self.ring = sorted((self._hash(f"{slot}:{i}"), slot) for slot in slots for i in range(replicas))
+        self.keys = [key for key, _ in self.ring]
+
+    @staticmethod
+    def _hash(value: str) -> int:
+        return int.from_bytes(hashlib.md5(value.encode("utf-8")).digest()[:8], "big")
+
+    def slot_for(self, session_id: str) -> int:
+        index = bisect.bisect(self.keys, self._hash(session_id)) % len(self.ring)
+        return self.ring[index][1]
+
+# Worker process ----------------------------------------------------------------------------------------------------------------------------------------
+def _load_handler(handler: str):
+    module_name, function_name = handler.split(":")
+    return getattr(importlib.import_module(module_name), function_name)
+
+def worker_main(slot: int, requests, responses, handler: str = DEFAULT_HANDLER, threads: int = WORKER_THREADS):
+    "Worker process: owns its own MultiAgentSystem and serves its sessions, in order within each session."
+    signal.signal(signal.SIGINT, signal.SIG_IGN) # Shutdown is driven by the supervisor's drain, not Ctrl+C
+    os.environ["WORKER_THREADS"] = str(threads) # Sizes the deadline pool to this worker's concurrency before main is imported
+    run = _load_handler(handler)
+    if handler == DEFAULT_HANDLER:
+        from main import get_multi_agent_system
+        get_multi_agent_system() # Build the graph before reporting ready so the first turn is not slower
+    responses.put(("ready", slot, None, os.getpid()))
+
+    executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix=f"worker-{slot}")
+    session_queues = {} # session_id -> deque of queued requests; present while the session has work running
+    lock = threading.Lock()
+
+    def serve_session(session_id):
+        # Runs one session's requests back to back so its turns never overlap or reorder
+        while True:
+            with lock:
+                if not session_queues[session_id]:
+                    del session_queues[session_id]
+                    return
+                request_id, payload = session_queues[session_id].popleft()
+            responses.put(("started", slot, request_id, None)) # Lets the supervisor age running requests
+            try:
+                responses.put(("result", slot, request_id, run(**payload)))
+            except Exception as e:
+                responses.put(("error", slot, request_id, f"{type(e).__name__}: {e}"))
+
+    while True:
+        message = requests.get()
+        if message is None:
+            break # Drain: everything queued before the sentinel still gets served below
+        kind, request_id, payload = message
+        if kind == "ping":
+            responses.put(("pong", slot, request_id, None))
+            continue
+        session_id = payload["session_id"]
+        with lock:
+            running = session_id in session_queues
+            session_queues.setdefault(session_id, deque()).append((request_id, payload))
+        if not running:
+            executor.submit(serve_session, session_id)
+    executor.shutdown(wait=True)
+    if "memory.postgres_memory" in sys.modules:
+        # Hand the worker's Postgres connections back now instead of leaving them for the server to time out
+        sys.modules["memory.postgres_memory"].close_pools()
+    responses.put(("stopped", slot, None, None))
+
+# Supervisor -------------------------------------------------------------------------------------------------------------------------------------------
+class WorkerPool:
+    "Starts N worker processes, routes sessions to them by consistent hashing, restarts crashed workers and drains gracefully."
+
+    def __init__(self, workers: int = WORKER_COUNT, handler: str = DEFAULT_HANDLER, threads: int = WORKER_THREADS):
+        self.workers = workers
+        self.handler = handler
+        self.threads = threads
+        self.ring = ConsistentHashRing(range(workers))
+        self.context = mp.get_context("spawn") # Fresh interpreters; nothing (clients, sqlite connections) is inherited
+        self.responses = self.context.Queue()
+        self.processes = {}
+        self.requests = {}
+        self.last_seen = {}
+        self.pending = {} # request_id -> (slot, Future)
+        self.running = {} # request_id -> monotonic time its worker started it
+        self.ready = set()
+        self.lock = threading.Lock()
+        self.draining = False
+        self.stopped = threading.Event()
+        self.restarts = 0
+
+    def start(self, wait_ready: float = 120):
+        "Start every worker and wait until each has built its system."
+        for slot in range(self.workers):
+            self._spawn(slot)
+        self.collector = threading.Thread(target=self._collect, name="pool-collector", daemon=True)
+        self.collector.start()
+        self.monitor = threading.Thread(target=self._monitor, name="pool-monitor", daemon=True)
+        self.monitor.start()
+        deadline = time.monotonic() + wait_ready
+        while time.monotonic() < deadline and len(self.ready) < self.workers:
+            time.sleep(0.05)
+        print(f"Worker pool started with {len(self.ready)}/{self.workers} workers ready")
+        return self
+
+    def _spawn(self, slot):
+        with self.lock:
+            self._spawn_locked(slot)
+
+    def _spawn_locked(self, slot):
+        # Caller holds self.lock, so submit() can never pick up the queue of a worker that is being replaced
+        self.ready.discard(slot)
+        self.requests[slot] = self.context.Queue()
+        process = self.context.Process(
+            target=worker_main, args=(slot, self.requests[slot], self.responses, self.handler, self.threads),
+            name=f"agent-worker-{slot}", daemon=True
+        )
+        process.start()
+        self.processes[slot] = process
+        self.last_seen[slot] = time.monotonic()
+
+    def submit(self, session_id: str, user_input: str, user_id: str = None) -> Future:
+        "Queue a turn on the worker that owns this session."
+        if self.draining:
+            raise RuntimeError("Worker pool is draining and no longer accepts requests")
+        slot = self.ring.slot_for(session_id)
+        request_id = uuid.uuid4().hex
+        future = Future()
+        with self.lock:
+            self.pending[request_id] = (slot, future)
+            self.requests[slot].put(("run", request_id, {"user_input": user_input, "session_id": session_id, "user_id": user_id}))
+        return future
+
+    def _collect(self):
+        while not self.stopped.is_set():
+            try:
+                kind, slot, request_id, value = self.responses.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            with self.lock:
+                self.last_seen[slot] = time.monotonic()
+                if kind == "ready":
+                    self.ready.add(slot)
+                elif kind == "started" and request_id in self.pending:
+                    self.running[request_id] = time.monotonic()
+                if kind in ("result", "error"):
+                    self.running.pop(request_id, None)
+                entry = self.pending.pop(request_id, None) if kind in ("result", "error") else None
+            if entry is None:
+                continue
+            _, future = entry
+            if kind == "result":
+                future.set_result(value)
+            else:
+                future.set_exception(RuntimeError(value))
+
+    def _monitor(self):
+        # Health checks: restart dead workers and workers that stop answering pings
+        while not self.stopped.wait(HEALTH_CHECK_INTERVAL):
+            if self.draining:
+                continue
+            for slot in range(self.workers):
+                process = self.processes[slot]
+                silent_for = time.monotonic() - self.last_seen[slot]
+                stuck_for = self._oldest_running(slot)
+                if not process.is_alive():
+                    print(f"Worker {slot} exited with code {process.exitcode}; restarting")
+                    self._restart(slot)
+                elif silent_for > HEALTH_CHECK_TIMEOUT or stuck_for > STUCK_REQUEST_TIMEOUT:
+                    reason = f"unresponsive for {silent_for:.0f}s" if silent_for > HEALTH_CHECK_TIMEOUT else f"stuck on a request for {stuck_for:.0f}s"
+                    print(f"Worker {slot} {reason}; restarting")
+                    process.kill()
+                    process.join(5)
+                    self._restart(slot)
+                else:
+                    self.requests[slot].put(("ping", uuid.uuid4().hex, None))
+
+    def _oldest_running(self, slot):
+        # Seconds the slot's longest-running request has been executing, 0 if it has none
+        now = time.monotonic()
+        with self.lock:
+            started = [self.running[request_id] for request_id, (owner, _) in self.pending.items() if owner == slot and request_id in self.running]
+        return now - min(started) if started else 0.0
+
+    def _restart(self, slot):
+        # In-flight turns on the dead worker fail; a retry resumes from their checkpoints on the new worker
+        with self.lock:
+            lost = [request_id for request_id, (owner, _) in self.pending.items() if owner == slot]
+            futures = [self.pending.pop(request_id)[1] for request_id in lost]
+            for request_id in lost:
+                self.running.pop(request_id, None)
+            self.restarts += 1
+            # Swap in the new queue before releasing the lock; a submit() in between would land on the dead worker's queue
+            self._spawn_locked(slot)
+        for future in futures:
+            future.set_exception(RuntimeError(f"Worker {slot} crashed before finishing the request"))
+
+    def drain(self, timeout: float = 120):
+        "Stop accepting requests, let workers finish what is queued, then stop them."
+        self.draining = True
+        for slot in range(self.workers):
+            self.requests[slot].put(None)
+        deadline = time.monotonic() + timeout
+        for slot, process in self.processes.items():
+            process.join(max(deadline - time.monotonic(), 0))
+            if process.is_alive():
+                print(f"Worker {slot} did not drain in time; terminating")
+                process.terminate()
+                process.join(5)
+        # Give the collector a moment to deliver the last responses before stopping it
+        while self.pending and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self.stopped.set()
+        # Whatever is still pending belonged to a worker that was terminated; fail it so no caller waits forever
+        with self.lock:
+            lost = list(self.pending.items())
+            self.pending.clear()
+            self.running.clear()
+        for request_id, (slot, future) in lost:
+            future.set_exception(RuntimeError(f"Worker {slot} was terminated before finishing the request"))
+        print(f"Worker pool drained ({self.restarts} restarts)")
+
+def _terminate(signum, frame):
+    raise KeyboardInterrupt # Handled like Ctrl+C: stop reading and drain
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the multi-agent system on a pool of worker processes.")
+    parser.add_argument("--workers", type=int, default=WORKER_COUNT)
+    parser.add_argument("--threads", type=int, default=WORKER_THREADS, help="Concurrent sessions per worker")
+    args = parser.parse_args()
+
+    pool = WorkerPool(workers=args.workers, threads=args.threads).start()
+    # SIGTERM (e.g. on scale-down) drains instead of dropping in-flight turns
+    signal.signal(signal.SIGTERM, _terminate)
+    print("Enter one request per line as: <session_id><TAB><message>")
+    try:
+        for line in sys.stdin:
+            session_id, _, message = line.rstrip("\n").partition("\t")
+            if not message:
+                continue
+            future = pool.submit(session_id, message)
+            future.add_done_callback(lambda f, s=session_id: print(f"[{s}] Agent: {f.result() if not f.exception() else f'Error: {f.exception()}'}"))
+    except KeyboardInterrupt:
+        pass
+    pool.drain()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+import argparse
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+MANIFEST_DB_PATH = "ingest_manifest.db" # Content hashes of everything already in the index, used to skip unchanged chunks
+SUPPORTED_EXTENSIONS = (".txt", ".md")
+# Azure AI Search rejects requests over 16 MB; 100 documents of 1536 floats serialised as JSON come to about 3.5 MB
+UPLOAD_BATCH_SIZE = 100
+
+# Streaming readers --------------------------------------------------------------------------------------------------------------------------------
+def iter_files(path, extensions=SUPPORTED_EXTENSIONS):
+    "Yield matching file paths under a file or directory without listing the whole tree up front."
+    # Resolved paths, so `corpus`, `./corpus` and its absolute path all map to the same source ids
+    path = os.path.realpath(path)
+    if os.path.isfile(path):
+        yield path
+        return
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            if name.lower().endswith(extensions):
+                yield os.path.join(root, name)
+
+def iter_documents(path, extensions=SUPPORTED_EXTENSIONS):
+    "Yield (source, text) one file at a time so only the current file is held in memory."
+    for file_path in iter_files(path, extensions):
+        try:
+            with open(file_path, encoding="utf-8", errors="replace") as f:
+                yield file_path, f.read()
+        except OSError as e:
+            print(f"Skipping {file_path}: {e}")
+
+def iter_chunks(documents, splitter):
+    "Split documents into chunks whose ids come from the source and the chunk's content, not its position."
+    for source, text in documents:
+        source_id = hashlib.sha1(source.encode("utf-8")).hexdigest()[:16]
+        emitted = set()
+        for chunk in splitter.split_text(text):
+            content_hash = hashlib.sha256(chunk.encode("utf-8")).hexdigest()
+            if content_hash in emitted:
+                continue # A repeated chunk within one file would map to the same id
+            emitted.add(content_hash)
+            yield {
+                # Editing one part of a file leaves the ids of its unchanged chunks alone, so only new content is embedded
+                "id": f"{source_id}-{content_hash[:32]}",
+                "source": source,
+                "content": chunk,
+                "hash": content_hash,
+            }
+
+# Rate limiting and manifest ---------------------------------------------------------------------------------------------------------------------------
+class RateLimiter:
+    "Spaces calls evenly so concurrent workers stay under a requests-per-minute quota."
+
+    def __init__(self, requests_per_minute=None):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute else 0.0
+        self.next_slot = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            slot = max(self.next_slot, now)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+class IngestManifest:
+    "SQLite record of which chunks (by source and content hash) are already in the index."
+
+    def __init__(self, db_path=MANIFEST_DB_PATH):
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS chunks (
+                id TEXT PRIMARY KEY,
+                source TEXT NOT NULL,
+                content_hash TEXT NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_chunks_source ON chunks (source)")
+        self.conn.commit()
+
+    def ids_for(self, source):
+        return {row[0] for row in self.conn.execute("SELECT id FROM chunks WHERE source = ?", (source,))}
+
+    def sources_under(self, directory):
+        "Sources recorded from earlier runs over this directory."
+        prefix = os.path.join(os.path.realpath(directory), "")
+        return [row[0] for row in self.conn.execute("SELECT DISTINCT source FROM chunks") if row[0].startswith(prefix)]
+
+    def record(self, chunks):
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO chunks (id, source, content_hash) VALUES (?, ?, ?)",
+            [(chunk["id"], chunk["source"], chunk["hash"]) for chunk in chunks]
+        )
+        self.conn.commit()
+
+    def forget(self, ids):
+        self.conn.executemany("DELETE FROM chunks WHERE id = ?", [(doc_id,) for doc_id in ids])
+        self.conn.commit()
+
+# Ingestion pipeline -----------------------------------------------------------------------------------------------------------------------------------
+class IngestionPipeline:
+    "Reads, chunks, embeds and uploads documents with batched, concurrent embedding and upload calls."
+
+    def __init__(self, store, embeddings, manifest_path=MANIFEST_DB_PATH, chunk_size=1000, chunk_overlap=200,
+                 embed_batch_size=64, upload_batch_size=UPLOAD_BATCH_SIZE, max_workers=4, requests_per_minute=None):
+        self.store = store # AzureSearchVector or LocalSearchVector
+        self.embeddings = embeddings
+        self.manifest = IngestManifest(manifest_path)
+        self.splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+        self.embed_batch_size = embed_batch_size
+        self.upload_batch_size = upload_batch_size
+        self.max_workers = max_workers
+        self.rate_limiter = RateLimiter(requests_per_minute)
+
+    def _embed(self, chunks):
+        self.rate_limiter.acquire()
+        vectors = self.embeddings.embed_documents([chunk["content"] for chunk in chunks])
+        return [dict(chunk, vector=vector) for chunk, vector in zip(chunks, vectors)]
+
+    def _upload(self, chunks):
+        self.store.upload_documents(chunks)
+        return chunks
+
+    def _delete(self, ids):
+        # Same batch size as uploads so large deletions stay within the service's per-request limit
+        for start in range(0, len(ids), self.upload_batch_size):
+            batch = ids[start:start + self.upload_batch_size]
+            self.store.delete_documents(batch)
+            self.manifest.forget(batch)
+        return len(ids)
+
+    def run(self, path, extensions=SUPPORTED_EXTENSIONS):
+        "Ingest a file or directory incrementally and return counters for the run; a directory run also removes files that are gone."
+        stats = {"files": 0, "chunks": 0, "skipped": 0, "embedded": 0, "uploaded": 0, "deleted": 0}
+        start = time.perf_counter()
+        embed_batch, upload_batch = [], []
+        embedding, uploading = set(), set()
+        # Bounded in-flight work keeps memory flat however large the corpus is
+        max_in_flight = self.max_workers * 2
+
+        def drain(futures, limit):
+            # Wait until at most `limit` futures are running and hand back the finished ones
+            finished = []
+            while len(futures) > limit:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                futures.difference_update(done)
+                finished.extend(future.result() for future in done)
+            return finished
+
+        def collect_uploads(limit):
+            for chunks in drain(uploading, limit):
+                # Only record chunks in the manifest once the index has them, so a failed run is retried next time
+                self.manifest.record(chunks)
+                stats["uploaded"] += len(chunks)
+
+        def collect_embeddings(limit):
+            for chunks in drain(embedding, limit):
+                stats["embedded"] += len(chunks)
+                upload_batch.extend(chunks)
+                while len(upload_batch) >= self.upload_batch_size:
+                    uploading.add(executor.submit(self._upload, upload_batch[:self.upload_batch_size]))
+                    del upload_batch[:self.upload_batch_size]
+                    collect_uploads(max_in_flight)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="ingest") as executor:
+            seen_sources = set()
+            for source, text in iter_documents(path, extensions):
+                stats["files"] += 1
+                seen_sources.add(source)
+                known = self.manifest.ids_for(source)
+                seen = set()
+                for chunk in iter_chunks([(source, text)], self.splitter):
+                    stats["chunks"] += 1
+                    seen.add(chunk["id"])
+                    if chunk["id"] in known:
+                        stats["skipped"] += 1
+                        continue
+                    embed_batch.append(chunk)
+                    if len(embed_batch) >= self.embed_batch_size:
+                        embedding.add(executor.submit(self._embed, embed_batch))
+                        embed_batch = []
+                        collect_embeddings(max_in_flight)
+                # Chunks that disappeared from a changed file are removed from the index
+                stale = [doc_id for doc_id in known if doc_id not in seen]
+                if stale:
+                    stats["deleted"] += self._delete(stale)
+            if os.path.isdir(path):
+                # Files removed from the corpus since the last run are removed from the index too
+                for source in self.manifest.sources_under(path):
+                    if source not in seen_sources and not os.path.exists(source): # Unreadable files are kept
+                        stats["deleted"] += self._delete(sorted(self.manifest.ids_for(source)))
+
+            if embed_batch:
+                embedding.add(executor.submit(self._embed, embed_batch))
+            collect_embeddings(0)
+            if upload_batch:
+                uploading.add(executor.submit(self._upload, upload_batch))
+            collect_uploads(0)
+
+        stats["seconds"] = time.perf_counter() - start
+        return stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest documents into the vector index.")
+    parser.add_argument("path", help="File or directory to ingest")
+    parser.add_argument("--backend", choices=["azure", "local"], default="azure")
+    parser.add_argument("--local-db", default="vector_index.db", help="SQLite file for the local backend")
+    parser.add_argument("--manifest", default=MANIFEST_DB_PATH)
+    parser.add_argument("--fake-embeddings", type=int, metavar="DIM", help="Use deterministic fake embeddings of this size (offline runs)")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--chunk-overlap", type=int, default=200)
+    parser.add_argument("--embed-batch-size", type=int, default=64)
+    parser.add_argument("--upload-batch-size", type=int, default=UPLOAD_BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--rpm", type=int, help="Maximum embedding requests per minute")
+    args = parser.parse_args()
+
+    if args.fake_embeddings:
+        from langchain_core.embeddings import DeterministicFakeEmbedding
+        embeddings = DeterministicFakeEmbedding(size=args.fake_embeddings)
+    else:
+        from common.common import get_embeddings
+        embeddings = get_embeddings()
+    if args.backend == "local":
+        from tools.localVector import LocalSearchVector
+        store = LocalSearchVector(args.local_db, embeddings)
+    else:
+        from common.common import get_vector_store
+        store = get_vector_store()
+
+    pipeline = IngestionPipeline(
+        store, embeddings, manifest_path=args.manifest, chunk_size=args.chunk_size, chunk_overlap=args.chunk_overlap,
+        embed_batch_size=args.embed_batch_size, upload_batch_size=args.upload_batch_size,
+        max_workers=args.workers, requests_per_minute=args.rpm
+    )
+    stats = pipeline.run(args.path)
+    print(f"Ingested {stats['files']} files: {stats['chunks']} chunks, {stats['skipped']} unchanged, "
+          f"{stats['embedded']} embedded, {stats['uploaded']} uploaded, {stats['deleted']} deleted "
+          f"in {stats['seconds']:.2f}s ({stats['chunks'] / max(stats['seconds'], 1e-9):.0f} chunks/s)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+import sqlite3
+import threading
+import numpy as np
+from langchain_core.documents import Document
+from common.deadline import call_with_deadline, DeadlineExceeded
+
+ALL_PARTITIONS = object() # Cache key for searches that span every partition
+
+class _PartitionMatrix:
+    "Cached normalised vectors for one partition, updated in place as documents are uploaded or deleted."
+
+    def __init__(self, rows):
+        self.ids, self.contents, self.rows = [], [], {} # rows: id -> row number in vectors
+        self.vectors = None
+        self.size = 0
+        for doc_id, content, vector in rows:
+            self.upsert(doc_id, content, np.frombuffer(vector, dtype=np.float32))
+
+    def upsert(self, doc_id, content, vector):
+        row = self.rows.get(doc_id)
+        if row is None:
+            if self.vectors is None or self.size == len(self.vectors):
+                # Grow capacity geometrically so appends are amortised O(1) instead of copying the matrix each time
+                grown = np.empty((max(2 * self.size, 64), len(vector)), dtype=np.float32)
+                if self.size:
+                    grown[:self.size] = self.vectors[:self.size]
+                self.vectors = grown
+            row = self.rows[doc_id] = self.size
+            self.ids.append(doc_id)
+            self.contents.append(content)
+            self.size += 1
+        else:
+            self.contents[row] = content
+        self.vectors[row] = vector
+
+    def remove(self, doc_id):
+        row = self.rows.pop(doc_id, None)
+        if row is None:
+            return
+        # Move the last row into the gap so rows stay contiguous
+        last = self.size - 1
+        if row != last:
+            moved = self.ids[last]
+            self.ids[row], self.contents[row], self.vectors[row] = moved, self.contents[last], self.vectors[last]
+            self.rows[moved] = row
+        self.ids.pop()
+        self.contents.pop()
+        self.size -= 1
+
+    def search(self, query, k):
+        if not self.size or k <= 0:
+            return []
+        scores = self.vectors[:self.size] @ query
+        top = np.argpartition(-scores, k - 1)[:k] if k < self.size else np.arange(self.size)
+        top = top[np.argsort(-scores[top])]
+        return [(self.contents[i], float(scores[i])) for i in top]
+
+class LocalSearchVector:
+    "SQLite-backed vector store with the same interface as AzureSearchVector, for offline runs and benchmarks."
+
+    def __init__(self, db_path, embeddings):
+        self.db_path = db_path
+        self.embeddings = embeddings
+        self.lock = threading.Lock() # Uploads can come from several ingestion workers at once
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        # partition lets one file hold several logical indexes (e.g. one per user) that are searched separately
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS documents (
+                id TEXT PRIMARY KEY,
+                partition TEXT NOT NULL DEFAULT '',
+                content TEXT NOT NULL,
+                vector BLOB NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_documents_partition ON documents (partition)")
+        self.conn.commit()
+        self._cache = {} # partition -> _PartitionMatrix, loaded on the first search of that partition and kept current on writes
+        self._data_version = self._read_data_version()
+
+    def upload_documents(self, documents):
+        "Insert or replace documents given as dicts with id, content, vector and an optional partition."
+        rows = []
+        for doc in documents:
+            vector = np.asarray(doc["vector"], dtype=np.float32)
+            norm = np.linalg.norm(vector)
+            if norm:
+                vector = vector / norm # Stored normalised so search is a single matrix-vector product
+            rows.append((doc["id"], doc.get("partition", ""), doc["content"], vector))
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO documents (id, partition, content, vector) VALUES (?, ?, ?, ?)",
+                [(doc_id, partition, content, vector.tobytes()) for doc_id, partition, content, vector in rows]
+            )
+            self.conn.commit()
+            # Append to the cached matrices rather than dropping them, so the next search does not reload the table
+            for doc_id, partition, content, vector in rows:
+                for key in (partition, ALL_PARTITIONS):
+                    if key in self._cache:
+                        self._cache[key].upsert(doc_id, content, vector)
+        return len(rows)
+
+    def existing_ids(self, ids):
+        "Return the subset of ids already stored."
+        ids = list(ids)
+        found = set()
+        with self.lock:
+            for start in range(0, len(ids), 500): # Stay under SQLite's bound-parameter limit
+                chunk = ids[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                found.update(row[0] for row in self.conn.execute(f"SELECT id FROM documents WHERE id IN ({placeholders})", chunk))
+        return found
+
+    def delete_documents(self, ids):
+        "Delete documents by id."
+        with self.lock:
+            self.conn.executemany("DELETE FROM documents WHERE id = ?", [(doc_id,) for doc_id in ids])
+            self.conn.commit()
+            for matrix in self._cache.values():
+                for doc_id in ids:
+                    matrix.remove(doc_id)
+        return len(ids)
+
+    def _read_data_version(self):
+        # Changes whenever another connection (e.g. another worker process or an ingestion run) commits to the file
+        return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _load(self, partition):
+        # Caller holds the lock. Only the searched partition is read, so one user's recall never scans everyone else's vectors
+        data_version = self._read_data_version()
+        if data_version != self._data_version:
+            # Our own writes are already applied to the cache; anyone else's mean it can no longer be trusted
+            self._cache.clear()
+            self._data_version = data_version
+        key = ALL_PARTITIONS if partition is None else partition
+        if key not in self._cache:
+            if key is ALL_PARTITIONS:
+                rows = self.conn.execute("SELECT id, content, vector FROM documents")
+            else:
+                rows = self.conn.execute("SELECT id, content, vector FROM documents WHERE partition = ?", (partition,))
+            self._cache[key] = _PartitionMatrix(rows)
+        return self._cache[key]
+
+    def similarity_search_by_vector(self, vector, k: int = 3, partition=None):
+        "Return the k documents closest to an already computed query vector, optionally within one partition."
+        query = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+        with self.lock:
+            results = self._load(partition).search(query, k)
+        return [Document(page_content=content, metadata={"score": score}) for content, score in results]
+
+    def similarity_search(self, query: str, k: int = 3, partition=None):
+        try:
+            print(f"Performing local similarity search for: '{query}'")
+            docs = self.similarity_search_by_vector(call_with_deadline(self.embeddings.embed_query, query), k=k, partition=partition)
+            print(f"Found {len(docs)} results")
+            return docs
+        except DeadlineExceeded:
+            raise
+        except Exception as e:
+            print(f"Search error: {type(e).__name__}: {e}")
+            return []
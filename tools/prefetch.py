@@ -0,0 +1,82 @@
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from dotenv import load_dotenv
+from common.common import get_vector_store
+load_dotenv()
+
+# Routes allowed to consume a speculative knowledge-base search; set to an empty string to disable prefetching
+KB_PREFETCH_ROUTES = [route.strip().lower() for route in os.getenv("KB_PREFETCH_ROUTES", "research_agent,planner_agent").split(",") if route.strip()]
+KB_PREFETCH_WAIT_SECONDS = float(os.getenv("KB_PREFETCH_WAIT_SECONDS", "10"))
+# One search per concurrent turn, so a prefetch never queues behind another turn's and leaves the research agent waiting on it
+KB_PREFETCH_WORKERS = int(os.getenv("KB_PREFETCH_WORKERS", os.getenv("WORKER_THREADS", "8")))
+
+class KnowledgePrefetcher:
+    "Runs the knowledge-base search on the raw user input while the orchestrator is still routing."
+
+    def __init__(self, get_vector_store, routes, k: int = 3, max_workers: int = KB_PREFETCH_WORKERS):
+        self.get_vector_store = get_vector_store # Resolved in the worker so the first-use connection check never blocks the caller
+        self.routes = routes
+        self.k = k
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="kb-prefetch")
+        self.pending = {} # prefetch_id -> Future; only the id goes into task_context so graph state stays serializable
+        self.lock = threading.Lock()
+        self.metrics = {"started": 0, "hits": 0, "wasted": 0, "cancelled": 0}
+
+    def start(self, query: str):
+        "Start a speculative search and return its id, or None when prefetching is disabled."
+        if not self.routes or not query.strip():
+            return None
+        prefetch_id = uuid.uuid4().hex
+        future = self.executor.submit(self._search, query)
+        with self.lock:
+            self.pending[prefetch_id] = future
+            self.metrics["started"] += 1
+        return prefetch_id
+
+    def _search(self, query: str):
+        return self.get_vector_store().similarity_search(query, self.k)
+
+    def keep_for_route(self, prefetch_id: str, route: str):
+        "Drop the prefetch straight away when the chosen route will never consume it."
+        if prefetch_id and route not in self.routes:
+            self.discard(prefetch_id)
+
+    def take(self, prefetch_id: str, timeout: float = KB_PREFETCH_WAIT_SECONDS):
+        "Consume the prefetched documents, or return None if there is nothing usable."
+        with self.lock:
+            future = self.pending.pop(prefetch_id, None) if prefetch_id else None
+        if future is None:
+            return None
+        try:
+            docs = future.result(timeout=timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            docs = None
+        except Exception:
+            docs = None # e.g. the search ran out of turn budget; the agent searches again itself if it needs to
+        with self.lock:
+            # Failed or empty searches (similarity_search returns [] on errors) saved the agent nothing
+            self.metrics["hits" if docs else "wasted"] += 1
+        return docs or None
+
+    def discard(self, prefetch_id: str):
+        "Forget a prefetch that was not consumed, cancelling it if the search has not started yet."
+        with self.lock:
+            future = self.pending.pop(prefetch_id, None) if prefetch_id else None
+            if future is None:
+                return
+            if future.cancel():
+                self.metrics["cancelled"] += 1
+            else:
+                self.metrics["wasted"] += 1
+
+    def stats(self):
+        "Prefetch hit rate and wasted work so far."
+        with self.lock:
+            metrics = dict(self.metrics)
+        metrics["hit_rate"] = metrics["hits"] / metrics["started"] if metrics["started"] else 0.0
+        return metrics
+
+kb_prefetcher = KnowledgePrefetcher(get_vector_store, KB_PREFETCH_ROUTES)
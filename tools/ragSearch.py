@@ -1,32 +1,50 @@
-from azure.core.credentials import AzureKeyCredential
-from azure.search.documents import SearchClient
-from azure.search.documents.models import VectorizedQuery
+import threading
 from langchain_core.documents import Document
+from common.deadline import call_with_deadline, remaining_budget, DeadlineExceeded
 
 class AzureSearchVector:
-    def __init__(self, endpoint, key, index_name, embeddings, vector_field="contentVector", text_field="content"):
+    def __init__(self, endpoint, key, index_name, embeddings, vector_field="contentVector", text_field="content", key_field="chunk_id"):
         # Clean endpoint
         endpoint = endpoint.rstrip('/')
         if '/indexes/' in endpoint:
             endpoint = endpoint.split('/indexes/')[0]
         
+        self.endpoint = endpoint
+        self.key = key
+        self.index_name = index_name
+        self.embeddings = embeddings
+        self.vector_field = vector_field
+        self.text_field = text_field
+        self.key_field = key_field
+        # The SDK import and the connection test happen on first use so startup needs no network
+        self._client = None
+        self._client_lock = threading.Lock()
+    
+    @property
+    def client(self):
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = self._connect()
+        return self._client
+    
+    def _connect(self):
+        from azure.core.credentials import AzureKeyCredential
+        from azure.search.documents import SearchClient
         # Create credential properly
-        credential = AzureKeyCredential(key)
+        credential = AzureKeyCredential(self.key)
         try:
-            self.client = SearchClient(
-                endpoint=endpoint,
-                index_name=index_name,
+            client = SearchClient(
+                endpoint=self.endpoint,
+                index_name=self.index_name,
                 credential=credential  
             )
-            self.embeddings = embeddings
-            self.vector_field = vector_field
-            self.text_field = text_field
             
-            # Test connection
-            # print(f"  Testing connection...")
-            # Try to get document count
-            results = self.client.search(search_text="*", top=1, include_total_count=True)
+            # Test connection - results are lazy, so ask for the count to force a round trip
+            results = client.search(search_text="*", top=1, include_total_count=True)
+            results.get_count()
             print(f"Connected successfully to Azure Search")
+            return client
             
         except Exception as e:
             print(f"Failed to initialize Azure Search client")
@@ -39,10 +57,11 @@ class AzureSearchVector:
             print(f"Performing similarity search for: '{query}'")
             
             # Generate embedding
-            query_vector = self.embeddings.embed_query(query)
+            query_vector = call_with_deadline(self.embeddings.embed_query, query)
             # print(f"Generated embedding vector of length: {len(query_vector)}")
             
             # Create vector query
+            from azure.search.documents.models import VectorizedQuery
             vector_query = VectorizedQuery(
                 vector=query_vector,
                 k_nearest_neighbors=k,
@@ -52,13 +71,20 @@ class AzureSearchVector:
             # print(f"Searching in field: {self.vector_field}")
             # print(f"Returning field: {self.text_field}")
             
-            # Search
-            results = self.client.search(
-                search_text=None,
-                vector_queries=[vector_query],
-                select=[self.text_field],
-                top=k
-            )
+            def search():
+                # The remaining budget becomes the request timeout, so a call abandoned at the deadline does not keep holding a pool thread
+                budget = remaining_budget()
+                timeouts = {} if budget is None else {"timeout": max(budget, 0.001), "read_timeout": max(budget, 0.001)}
+                return list(self.client.search(
+                    search_text=None,
+                    vector_queries=[vector_query],
+                    select=[self.text_field],
+                    top=k,
+                    **timeouts
+                ))
+            
+            # Search - results are paged lazily, so collect them inside the bounded call; the search is idempotent and may be hedged
+            results = call_with_deadline(search, hedge="search")
             
             # Convert to documents
             docs = []
@@ -71,8 +97,29 @@ class AzureSearchVector:
             print(f"Found {len(docs)} results")
             return docs
             
+        except DeadlineExceeded:
+            raise # Let the turn return partial results instead of treating this as an empty search
         except Exception as e:
             print(f"Search error: {type(e).__name__}: {e}")
             import traceback
             traceback.print_exc()
-            return []
\ No newline at end of file
+            return []
+    
+    def upload_documents(self, documents):
+        "Merge or upload documents given as dicts with id, content and vector into the index."
+        batch = [
+            {self.key_field: doc["id"], self.text_field: doc["content"], self.vector_field: list(doc["vector"])}
+            for doc in documents
+        ]
+        results = self.client.merge_or_upload_documents(documents=batch)
+        failed = [result.key for result in results if not result.succeeded]
+        if failed:
+            raise RuntimeError(f"Failed to upload {len(failed)} documents, first key: {failed[0]}")
+        return len(batch)
+    
+    def delete_documents(self, ids):
+        "Delete documents from the index by key."
+        if not ids:
+            return 0
+        self.client.delete_documents(documents=[{self.key_field: doc_id} for doc_id in ids])
+        return len(ids)
\ No newline at end of file
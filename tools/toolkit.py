@@ -1,10 +1,8 @@
 import os
 from langchain_core.tools import tool
-from tavily import TavilyClient
-from tools.ragSearch import AzureSearchVector
-from langchain_openai import AzureChatOpenAI, AzureOpenAIEmbeddings
 from dotenv import load_dotenv     
-from common.common import llm, embeddings, vector_store
+from common.common import get_llm, get_vector_store
+from common.deadline import call_with_deadline, invoke_with_deadline, remaining_budget
 load_dotenv()
 
 #  Define Tools - Mathematical Calculation, Text Summarization, Knowledge Base Search, Web Search------------------------------------------------------------------------------
@@ -21,13 +19,13 @@ def calculate(expression: str) -> str:
 def summarize_text(text: str) -> str:
     " Summarizes the given text using the LLM"
     prompt = f"Please provide a concise summary of the following text:\n\n{text}"
-    response = llm.invoke(prompt)
+    response = invoke_with_deadline(get_llm(), prompt)
     return response.content
 
 @tool
 def search_knowledge_base(query: str) -> str:
     " Searches the Azure AI Search vector database for relevant information. "
-    results = vector_store.similarity_search(query, k=3)
+    results = get_vector_store().similarity_search(query, k=3)
     if not results:
         return "No relevant information found in the knowledge base."
     
@@ -38,13 +36,17 @@ def search_knowledge_base(query: str) -> str:
 def web_search(query: str,  num_results: int = 3) -> str:
     " Searches the web using tavily search and provides upto 5 results."
     try:
+        from tavily import TavilyClient # Imported here so startup does not pay for it
         api_key = os.getenv("TAVILY_API_KEY")
         tavily_client = TavilyClient(api_key)
         client = TavilyClient("tvly-dev-********************************")
-        response = tavily_client.search(
+        budget = remaining_budget()
+        response = call_with_deadline(
+                tavily_client.search,
                 query=query,
                 max_results=3,
-                search_depth="basic"  # or "advanced" for more thorough search
+                search_depth="basic",  # or "advanced" for more thorough search
+                timeout=60 if budget is None else max(budget, 0.001) # Give up with the turn instead of holding a pool thread
             )
         print(response)
         return response['results']